@@ -0,0 +1,132 @@
+import asyncio
+from acpx_script import ACPXBinScript
+
+
+# Decoding and encoding are run in the executor (ProcessPoolExecutor for the true parallelism, by default the loop's
+# one), file reading and writing in the loop's default executor, so the event loop is never blocked.
+# Files are written only after the whole script is done, so cancelled or timed out job leaves no broken files.
+# Cancelled job in the process pool is finished by the worker, but its result is thrown away.
+
+
+def assemble_job(settings: tuple, text: str) -> tuple:
+    """Assemble the text in memory. Runs in the executor.
+    settings -- (version, bin encoding, txt encoding).
+    Returns...
+    (bin script data, 001's file data or None if there is no such file)"""
+    version, bin_encoding, txt_encoding = settings
+    script_obj = ACPXBinScript(version=version, bin_encoding=bin_encoding, txt_encoding=txt_encoding)
+    return script_obj.assemble_data(text)
+
+
+def disassemble_job(settings: tuple, bin_data: bytes, data_001: bytes) -> tuple:
+    """Disassemble the data in memory. Runs in the executor.
+    settings -- (version, bin encoding, txt encoding).
+    Returns...
+    (text, version of the script)"""
+    version, bin_encoding, txt_encoding = settings
+    script_obj = ACPXBinScript(version=version, bin_encoding=bin_encoding, txt_encoding=txt_encoding)
+    text = script_obj.disassemble_data(bin_data, data_001)
+    return text, script_obj.version
+
+
+class ACPXAsyncScript:
+    """Asynchronous counterpart of ACPXBinScript."""
+
+    def __init__(self, bin_file: str, txt_file: str, bin_encoding: str = "cp932", txt_encoding: str = "cp932",
+                 version: str = None, executor=None) -> None:
+        """Initialize ACPXAsyncScript class.
+        executor -- executor for decoding and encoding or None for the loop's default one.
+        For other arguments see ACPXBinScript."""
+        self._script = ACPXBinScript(bin_file, txt_file, bin_encoding=bin_encoding, txt_encoding=txt_encoding,
+                                     version=version)
+        self.executor = executor
+
+    @property
+    def version(self):
+        """Script's version."""
+        return self._script.version
+
+    @property
+    def settings(self) -> tuple:
+        """(version, bin encoding, txt encoding) of the script."""
+        return self._script.version, self._script.bin_encoding, self._script.txt_encoding
+
+    async def assemble(self, timeout: float = None) -> None:
+        """Assemble the script.
+        timeout -- time limit in seconds or None."""
+        await asyncio.wait_for(self._assemble(), timeout)
+
+    async def disassemble(self, timeout: float = None) -> None:
+        """Disassemble the script.
+        timeout -- time limit in seconds or None."""
+        await asyncio.wait_for(self._disassemble(), timeout)
+
+    async def _assemble(self) -> None:
+        """Assemble the script: read the text, assemble it in the executor, write the files."""
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(None, self._read_text)
+        bin_data, data_001 = await loop.run_in_executor(self.executor, assemble_job, self.settings, text)
+        await loop.run_in_executor(None, self._script.save_data, bin_data, data_001)
+
+    async def _disassemble(self) -> None:
+        """Disassemble the script: read the files, disassemble them in the executor, write the text."""
+        loop = asyncio.get_running_loop()
+        bin_data, data_001 = await loop.run_in_executor(None, self._script.load_data)
+        text, version = await loop.run_in_executor(self.executor, disassemble_job, self.settings, bin_data,
+                                                   data_001)
+        self._script.version = version
+        await loop.run_in_executor(None, self._write_text, text)
+
+    def _read_text(self) -> str:
+        """Read the text."""
+        with open(self._script.txt_file, 'r', encoding=self._script.txt_encoding, errors='replace') as df:
+            return df.read()
+
+    def _write_text(self, text: str) -> None:
+        """Write the text."""
+        with open(self._script.txt_file, 'w', encoding=self._script.txt_encoding) as df:
+            df.write(text)
+
+
+class ACPXAsyncBatch:
+    """Many scripts at once with bounded parallelism."""
+
+    default_max_parallel = 8
+
+    def __init__(self, max_parallel: int = None, executor=None, timeout: float = None) -> None:
+        """Initialize ACPXAsyncBatch class.
+        max_parallel -- maximum number of the scripts in work at once.
+        executor -- executor for decoding and encoding or None for the loop's default one.
+        timeout -- time limit of every script in seconds or None."""
+        self.max_parallel = max_parallel if max_parallel else self.default_max_parallel
+        self.executor = executor
+        self.timeout = timeout
+
+    async def assemble(self, pairs: list, **settings) -> list:
+        """Assemble the scripts.
+        pairs -- (bin script, text) of every script.
+        settings -- version, bin_encoding, txt_encoding.
+        Returns...
+        None or the exception of every script, in order of pairs."""
+        return await self._run("assemble", pairs, settings)
+
+    async def disassemble(self, pairs: list, **settings) -> list:
+        """Disassemble the scripts.
+        pairs -- (bin script, text) of every script.
+        settings -- version, bin_encoding, txt_encoding.
+        Returns...
+        None or the exception of every script, in order of pairs."""
+        return await self._run("disassemble", pairs, settings)
+
+    async def _run(self, mode: str, pairs: list, settings: dict) -> list:
+        """Run the jobs, not more than max_parallel at once."""
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        jobs = [self._run_one(semaphore, mode, ACPXAsyncScript(scr_file, txt_file, executor=self.executor,
+                                                               **settings))
+                for scr_file, txt_file in pairs]
+        return await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def _run_one(self, semaphore: asyncio.Semaphore, mode: str, script: ACPXAsyncScript) -> None:
+        """Run the job, when there is a place for it."""
+        async with semaphore:
+            await getattr(script, mode)(self.timeout)
@@ -1,18 +1,28 @@
 import os
-import threading
+import time
+import queue
 import ctypes
+import collections
+import concurrent.futures
+import multiprocessing
 import locale
 import tkinter as tk
 import tkinter.ttk as ttk
 from tkinter.messagebox import showerror, showwarning, showinfo
 from tkinter.filedialog import askopenfilename, askdirectory
 from acpx_script import ACPXBinScript
+from acpx_build_manifest import ACPXBuildManifest
+from acpx_cli import ACPXBatch
+from acpx_jobs import run_job, check_job
 
 
 class ACPXBinScriptGUI:
     default_width = 400
     default_height = 500
-    default_max_thread_activity = 10
+    default_max_thread_activity = os.cpu_count() or 1
+    queue_factor = 2  # Submitted but not finished jobs per worker.
+    events_interval = 100  # Between the drains of the workers' events, in milliseconds.
+    max_errors_shown = 10
 
     possible_languages = ("eng", "rus")
     format_name = "bin"
@@ -62,6 +72,11 @@ class ACPXBinScriptGUI:
             "Choose the script version:",
             "Bin encoding:",
             "Txt encoding:",
+            "All scripts are up to date.",
+            "Cancel",  # 35
+            "Cancelled. ",
+            "{} of {} files, {} failed. {:.1f} files/s, {:.2f} MB/s.",
+            "Checking the scripts...",
         ),
         "rus": (
             "ACPXScriptTool от Tester-а",  # 0
@@ -98,6 +113,11 @@ class ACPXBinScriptGUI:
             "Выберите версию скриптов:",
             "Кодировка bin:",
             "Кодировка txt:",
+            "Все скрипты уже собраны.",
+            "Отмена",  # 35
+            "Отменено. ",
+            "{} из {} файлов, {} с ошибкой. {:.1f} файлов/с, {:.2f} МБ/с.",
+            "Проверяем скрипты...",
         )
     }
 
@@ -183,16 +203,28 @@ In version ESCR_NEW:
     }
 
     def __init__(self, **kwargs):
-        """Arguments: width, height, language ("eng", "rus"), max_thread_activity..."""
+        """Arguments: width, height, language ("eng", "rus"), max_thread_activity (number of worker processes)..."""
         self._width = kwargs.get("width", self.default_width)
         self._height = kwargs.get("height", self.default_height)
         self._language = kwargs.get("language", self.init_language())
         self._max_thread_activity = kwargs.get("max_thread_activity", self.default_max_thread_activity)
-        self._thread_semaphore = threading.BoundedSemaphore(self._max_thread_activity)
-        self._unlocker_count = 0
-        self._count_lock = threading.Lock()
-        self._print_lock = threading.Lock()
-        self._status_lock = threading.Lock()
+
+        # Jobs are run by the pool of processes. Finished ones are put in the queue by the pool's thread
+        # and are drained by the Tk main loop, the only one to touch the widgets.
+        self._executor = None
+        self._events = queue.Queue()
+        self._pending_jobs = collections.deque()  # Not yet submitted jobs.
+        self._running_jobs = set()  # Futures of the submitted jobs.
+        self._check_futures = []  # (future, files) of the manifest checks before the assembling.
+        self._job_mode = ""
+        self._job_manifest = None
+        self._job_settings = None  # (version, bin encoding, txt encoding) for the manifest.
+        self._job_total = 0
+        self._job_done = 0
+        self._job_errors = []  # (bin script, text, error message).
+        self._job_size = 0
+        self._job_start = 0.0
+        self._job_cancelled = False
 
         self._root = tk.Tk()
         self._root.lang_index = 0
@@ -334,6 +366,18 @@ In version ESCR_NEW:
             )
             new_btn.lang_index = 20 + num
             self._action_btn.append(new_btn)
+        self._cancel_btn = tk.Button(
+            master=self._commands_lfr,
+            command=self._cancel,
+            font=('Helvetica', 12),
+            bg='white',
+            state=tk.DISABLED,
+        )
+        self._cancel_btn.lang_index = 35
+
+        self._progress_bar = ttk.Progressbar(master=self._status_lfr,
+                                             orient=tk.HORIZONTAL,
+                                             mode='determinate')
 
         self._init_strings()
 
@@ -392,10 +436,12 @@ In version ESCR_NEW:
         # Commands.
 
         for i, widget in enumerate(self._action_btn):
-            widget.place(relx=0.0+i*0.5, rely=0.0, relwidth=0.5, relheight=1.0)
+            widget.place(relx=0.0+i*0.35, rely=0.0, relwidth=0.35, relheight=1.0)
+        self._cancel_btn.place(relx=0.7, rely=0.0, relwidth=0.3, relheight=1.0)
 
-        # Text area.
+        # Progress bar and text area.
 
+        self._progress_bar.pack(fill=tk.X)
         self._status_txt.pack()
 
         # Help buttons.
@@ -415,6 +461,8 @@ In version ESCR_NEW:
         # To make more space for patching.
         if zlo:
             self._root.mainloop()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
 
     # Choose input/output files/dirs.
 
@@ -488,17 +536,208 @@ In version ESCR_NEW:
 
     def _lock_activity(self) -> None:
         """Lock disassemble and assemble actions while managing other files."""
-        self._status_txt["state"] = tk.NORMAL
-        self._status_txt.delete(1.0, tk.END)
-        self._status_txt.insert(1.0, self._strings_lib[self._language][25])
-        self._status_txt["state"] = tk.DISABLED
+        self._set_status(self._strings_lib[self._language][25])
         for widget in self._action_btn:
             widget["state"] = tk.DISABLED
+        self._cancel_btn["state"] = tk.NORMAL
 
     def _unlock_activity(self) -> None:
         """Unlock disassemble and assemble actions after managing other files."""
         for widget in self._action_btn:
             widget["state"] = tk.NORMAL
+        self._cancel_btn["state"] = tk.DISABLED
+
+    def _set_status(self, status: str) -> None:
+        """Set text of the status area."""
+        self._status_txt["state"] = tk.NORMAL
+        self._status_txt.delete(1.0, tk.END)
+        self._status_txt.insert(1.0, status)
+        self._status_txt["state"] = tk.DISABLED
+
+    # Jobs.
+
+    def _start_jobs(self, mode: str, files_to_manage: list, manifest: ACPXBuildManifest = None) -> None:
+        """Start (dis)assembling of the files on the pool.
+        mode -- "disassemble" or "assemble".
+        files_to_manage -- (bin script, text) of every file.
+        manifest -- build manifest to record the assembled scripts in or None."""
+        settings = {
+            "version": self._version.get(),
+            "bin_encoding": self._scr_enc.get(),
+            "txt_encoding": self._txt_enc.get(),
+            "cache": None,
+            "cache_size": None,
+            "ir_cache": False,
+        }
+        self._pending_jobs = collections.deque((mode, file_mes, file_txt, settings)
+                                               for file_mes, file_txt in files_to_manage)
+        self._job_mode = mode
+        self._job_manifest = manifest
+        self._job_settings = (settings["version"], settings["bin_encoding"], settings["txt_encoding"])
+        self._job_total = len(files_to_manage)
+        self._job_done = 0
+        self._job_errors = []
+        self._job_size = 0
+        self._job_start = time.perf_counter()
+        self._job_cancelled = False
+        self._progress_bar["maximum"] = max(self._job_total, 1)
+        self._progress_bar["value"] = 0
+
+        self._submit_jobs()
+        self._root.after(self.events_interval, self._drain_events)
+
+    def _submit_jobs(self) -> None:
+        """Submit the pending jobs, not more than queue_factor per worker at once."""
+        while self._pending_jobs and (len(self._running_jobs) < self._max_thread_activity * self.queue_factor):
+            future = self._submit(run_job, self._pending_jobs.popleft())
+            self._running_jobs.add(future)
+            future.add_done_callback(self._events.put)  # Called in the pool's thread.
+
+    def _submit(self, function, job: tuple) -> concurrent.futures.Future:
+        """Submit the job to the pool, which is started on the first job.
+        Broken pool (one of the workers has died) refuses all jobs, so it is replaced by the new one."""
+        if self._executor is None:
+            self._executor = self._get_new_executor()
+        try:
+            return self._executor.submit(function, job)
+        except concurrent.futures.BrokenExecutor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._get_new_executor()
+            return self._executor.submit(function, job)
+
+    def _get_new_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Get the new pool. Workers are spawned, not forked: fork of the process with live Tk is unsafe."""
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self._max_thread_activity,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+
+    def _start_checks(self, files_to_manage: list, manifest: ACPXBuildManifest) -> None:
+        """Check the scripts against the manifest on the pool, not to hash all the files in the main loop.
+        Scripts, that are not up to date, are assembled then.
+        files_to_manage -- (bin script, text) of every file.
+        manifest -- build manifest of the assembled directory."""
+        settings = (self._version.get(), self._scr_enc.get(), self._txt_enc.get())
+        chunk_size = max(-(-len(files_to_manage) // self._max_thread_activity), 1)
+        self._job_manifest = manifest
+        self._job_cancelled = False
+        self._check_futures = []
+        for i in range(0, len(files_to_manage), chunk_size):
+            chunk = files_to_manage[i:i + chunk_size]
+            self._check_futures.append((self._submit(check_job, (manifest.output_directory, chunk, settings)), chunk))
+        self._set_status(self._strings_lib[self._language][38])
+        self._root.after(self.events_interval, self._drain_checks)
+
+    def _drain_checks(self) -> None:
+        """Wait for the manifest checks and start the assembling of the scripts, that are not up to date."""
+        if not all(future.done() for future, chunk in self._check_futures):
+            self._root.after(self.events_interval, self._drain_checks)
+            return
+        files_to_manage = []
+        for future, chunk in self._check_futures:
+            if future.cancelled():
+                continue
+            try:
+                files_to_manage.extend(future.result())
+            except Exception:  # Broken pool and such. Unchecked scripts are just assembled.
+                files_to_manage.extend(chunk)
+        self._check_futures = []
+
+        if self._job_cancelled:
+            self._job_manifest = None
+            self._set_status(self._strings_lib[self._language][36])
+            self._unlock_activity()
+        elif not files_to_manage:
+            self._job_manifest = None
+            self._set_status(self._strings_lib[self._language][34])
+            self._unlock_activity()
+        else:
+            self._start_jobs("assemble", files_to_manage, self._job_manifest)
+
+    def _drain_events(self) -> None:
+        """Handle all the finished jobs at once, submit new ones and renew the progress."""
+        while True:
+            try:
+                future = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self._running_jobs.discard(future)
+            if future.cancelled():
+                continue
+            try:
+                scr_file, txt_file, error, size, cache_hit, txt_hash = future.result()
+            except Exception as ex:  # Broken pool and such.
+                scr_file, txt_file, error, size, cache_hit, txt_hash = "", "", str(ex), 0, None, None
+            self._job_done += 1
+            self._job_size += size
+            self._report_job(scr_file, txt_file, error, txt_hash)
+
+        if not self._job_cancelled:
+            self._submit_jobs()
+
+        elapsed = max(time.perf_counter() - self._job_start, 1e-9)
+        self._progress_bar["value"] = self._job_done
+        status = self._strings_lib[self._language][37].format(
+            self._job_done, self._job_total, len(self._job_errors), self._job_done / elapsed,
+            self._job_size / elapsed / 1024 / 1024)
+
+        if self._running_jobs or self._pending_jobs:
+            self._set_status(self._strings_lib[self._language][25] + "\n" + status)
+            self._root.after(self.events_interval, self._drain_events)
+            return
+        self._finish_jobs(status)
+
+    def _report_job(self, scr_file: str, txt_file: str, error, txt_hash: str) -> None:
+        """Print the result of the job and record it in the manifest."""
+        if self._job_mode == "disassemble":
+            if error is None:
+                print("Disassembling of {0} succeed./Дизассемблирование {0} прошло успешно.".format(scr_file))
+            else:
+                print("Disassembling of {0} error./Дизассемблирование {0} не удалось.".format(scr_file))
+        else:
+            if error is None:
+                print("Assembling of {0} succeed./Ассемблирование {0} прошло успешно.".format(scr_file))
+            else:
+                print("Assembling of {0} error./Ассемблирование {0} не удалось.".format(scr_file))
+        if error is not None:
+            self._job_errors.append((scr_file, txt_file, error))
+
+        if self._job_manifest is not None:
+            if error is None:
+                self._job_manifest.record(scr_file, txt_hash, ACPXBinScript(scr_file).file_001, self._job_settings)
+            else:
+                self._job_manifest.forget(scr_file)
+
+    def _finish_jobs(self, status: str) -> None:
+        """Show the final status and the errors and unlock the actions."""
+        if self._job_manifest is not None:
+            self._job_manifest.save()
+            self._job_manifest = None
+
+        if self._job_mode == "disassemble":
+            result_index = 27 if self._job_errors else 28
+        else:
+            result_index = 29 if self._job_errors else 30
+        result = self._strings_lib[self._language][result_index]
+        if self._job_cancelled:
+            result = self._strings_lib[self._language][36] + result
+        self._set_status(result + "\n" + status)
+        self._unlock_activity()
+
+        if self._job_errors:  # All errors in one message.
+            message = "\n\n".join("{}\n{}".format(scr_file if self._job_mode == "disassemble" else txt_file, error)
+                                   for scr_file, txt_file, error in self._job_errors[:self.max_errors_shown])
+            if len(self._job_errors) > self.max_errors_shown:
+                message += "\n\n..."
+            showerror(title=self._strings_lib[self._language][26], message=message)
+
+    def _cancel(self) -> None:
+        """Cancel the not yet started jobs. Started ones are finished."""
+        self._job_cancelled = True
+        self._pending_jobs.clear()
+        for future in list(self._running_jobs):
+            future.cancel()
+        for future, chunk in self._check_futures:
+            future.cancel()
+        self._cancel_btn["state"] = tk.DISABLED
 
     # Disassembling.
 
@@ -510,80 +749,14 @@ In version ESCR_NEW:
 
         self._lock_activity()
         if self._input_mode.get() == 0:  # File mode.
-            self._unlocker_count = 1
-            new_thread = threading.Thread(daemon=False, target=self._disassemble_this_scr,
-                                          args=(mes_file, txt_file))
-            new_thread.start()
+            self._start_jobs("disassemble", [(mes_file, txt_file)])
         else:  # Dir mode.
-            files_to_manage = []
             os.makedirs(txt_file, exist_ok=True)
-            ezz = len(mes_file.split(os.sep))
-            for root, dirs, files in os.walk(mes_file):
-                for file_name in files:
-                    extension = os.path.splitext(file_name)[1]
-                    if extension == ".001":
-                        continue
-
-                    new_file_array = []  # mes_file, txt_file
-
-                    basic_path = os.sep.join(os.path.join(root, file_name).split(os.sep)[ezz:])
-                    rel_mes_name = os.path.normpath(os.path.join(mes_file, basic_path))
-                    rel_txt_name = os.path.normpath(os.path.join(txt_file, os.path.splitext(basic_path)[0] + ".txt"))
-
-                    new_file_array.append(rel_mes_name)
-                    new_file_array.append(rel_txt_name)
-                    files_to_manage.append(new_file_array)
-
-                    # Why did I not initiate file management right away, thou ask?
-
-            self._unlocker_count = len(files_to_manage)  # ...That is the answer.
-
-            for file_mes, file_txt in files_to_manage:
-                new_thread = threading.Thread(daemon=False, target=self._disassemble_this_scr,
-                                              args=(file_mes, file_txt))
-                new_thread.start()
+            files_to_manage = ACPXBatch.get_disassemble_pairs(mes_file, txt_file)
+            self._start_jobs("disassemble", files_to_manage)
 
         return True
 
-    def _disassemble_this_scr(self, scr_file: str, txt_file: str) -> None:
-        """Disassemble this mes script."""
-
-        try:
-            self._thread_semaphore.acquire()
-            os.makedirs(os.path.dirname(txt_file), exist_ok=True)
-            script_obj = ACPXBinScript(scr_file, txt_file, debug=False, version=self._version.get(),
-                                       bin_encoding=self._scr_enc.get(), txt_encoding=self._txt_enc.get())
-            script_obj.disassemble()
-            self._status_lock.acquire()
-            self._status_txt["state"] = tk.NORMAL
-            self._status_txt.delete(1.0, tk.END)
-            self._status_txt.insert(1.0, scr_file + ": ")
-            self._status_txt.insert(2.0, self._strings_lib[self._language][28])
-            self._status_txt["state"] = tk.DISABLED
-            self._status_lock.release()
-            self._print_lock.acquire()
-            print("Disassembling of {0} succeed./Дизассемблирование {0} прошло успешно.".format(scr_file))
-            self._print_lock.release()
-        except Exception as ex:
-            self._print_lock.acquire()
-            print("Disassembling of {0} error./Дизассемблирование {0} не удалось.".format(scr_file))
-            self._print_lock.release()
-            showerror(title=self._strings_lib[self._language][26], message=scr_file + "\n" + str(ex))
-            self._status_lock.acquire()
-            self._status_txt["state"] = tk.NORMAL
-            self._status_txt.delete(1.0, tk.END)
-            self._status_txt.insert(1.0, scr_file + ": ")
-            self._status_txt.insert(2.0, self._strings_lib[self._language][27])
-            self._status_txt["state"] = tk.DISABLED
-            self._status_lock.release()
-        finally:
-            self._count_lock.acquire()
-            self._unlocker_count -= 1
-            self._count_lock.release()
-            if self._unlocker_count == 0:
-                self._unlock_activity()
-            self._thread_semaphore.release()
-
     def _assemble(self) -> bool:
         """Assemble a mes script or a group of them from the text file or a group of them"""
         mes_file, txt_file, status = self._get_scr_and_txt()
@@ -592,76 +765,16 @@ In version ESCR_NEW:
 
         self._lock_activity()
         if self._input_mode.get() == 0:  # File mode.
-            self._unlocker_count = 1
-            new_thread = threading.Thread(daemon=False, target=self._assemble_this_scr,
-                                          args=(mes_file, txt_file))
-            new_thread.start()
+            self._start_jobs("assemble", [(mes_file, txt_file)])
         else:  # Dir mode.
-            files_to_manage = []
             os.makedirs(txt_file, exist_ok=True)
-            ezz = len(txt_file.split(os.sep))
-            for root, dirs, files in os.walk(txt_file):
-                for file_name in files:
-                    new_file_array = []  # mes_file, txt_file
-
-                    basic_path = os.sep.join(os.path.join(root, file_name).split(os.sep)[ezz:])
-                    rel_mes_name = os.path.normpath(os.path.join(mes_file, os.path.splitext(basic_path)[0] + ".{}"
-                                                                 .format(self.format_name)))
-                    rel_txt_name = os.path.normpath(os.path.join(txt_file, basic_path))
-
-                    new_file_array.append(rel_mes_name)
-                    new_file_array.append(rel_txt_name)
-                    files_to_manage.append(new_file_array)
+            files_to_manage = ACPXBatch.get_assemble_pairs(txt_file, mes_file)
 
-                    # Why did I not initiate file management right away, thou ask?
-
-            self._unlocker_count = len(files_to_manage)  # ...That is the answer.
-
-            for file_mes, file_txt in files_to_manage:
-                new_thread = threading.Thread(daemon=False, target=self._assemble_this_scr,
-                                              args=(file_mes, file_txt))
-                new_thread.start()
+            # Scripts with the same texts and settings and with untouched files are skipped.
+            self._start_checks(files_to_manage, ACPXBuildManifest(mes_file))
 
         return True
 
-    def _assemble_this_scr(self, scr_file: str, txt_file: str) -> None:
-        """Assemble this mes script."""
-        try:
-            self._thread_semaphore.acquire()
-            os.makedirs(os.path.dirname(scr_file), exist_ok=True)
-            script_obj = ACPXBinScript(scr_file, txt_file, debug=False, version=self._version.get(),
-                                       bin_encoding=self._scr_enc.get(), txt_encoding=self._txt_enc.get())
-            script_obj.assemble()
-            self._status_lock.acquire()
-            self._status_txt["state"] = tk.NORMAL
-            self._status_txt.delete(1.0, tk.END)
-            self._status_txt.insert(1.0, scr_file + ": ")
-            self._status_txt.insert(2.0, self._strings_lib[self._language][30])
-            self._status_txt["state"] = tk.DISABLED
-            self._status_lock.release()
-            self._print_lock.acquire()
-            print("Assembling of {0} succeed./Ассемблирование {0} прошло успешно.".format(scr_file))
-            self._print_lock.release()
-        except Exception as ex:
-            self._print_lock.acquire()
-            print("Assembling of {0} error./Ассемблирование {0} не удалось.".format(scr_file))
-            self._print_lock.release()
-            showerror(title=self._strings_lib[self._language][26], message=txt_file + "\n" + str(ex))
-            self._status_lock.acquire()
-            self._status_txt["state"] = tk.NORMAL
-            self._status_txt.delete(1.0, tk.END)
-            self._status_txt.insert(1.0, scr_file + ": ")
-            self._status_txt.insert(2.0, self._strings_lib[self._language][29])
-            self._status_txt["state"] = tk.DISABLED
-            self._status_lock.release()
-        finally:
-            self._count_lock.acquire()
-            self._unlocker_count -= 1
-            self._count_lock.release()
-            if self._unlocker_count == 0:
-                self._unlock_activity()
-            self._thread_semaphore.release()
-
     def _get_scr_and_txt(self) -> tuple:
         """Get mes, txt files or directories and check status."""
         status = True
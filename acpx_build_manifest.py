@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+import threading
+
+
+class ACPXBuildManifest:
+    """Manifest of the assembled directory: what every script was assembled from and what it was assembled to.
+    Script, whose text and settings are the same and whose files are not touched, need not to be assembled again."""
+
+    manifest_format = 1
+    manifest_extension = ".acpx_manifest.json"
+
+    def __init__(self, output_directory: str) -> None:
+        """Initialize ACPXBuildManifest class.
+        output_directory -- directory with the assembled scripts. Manifest is stored next to it."""
+        self.output_directory = os.path.abspath(output_directory)
+        self.manifest_file = self.output_directory + self.manifest_extension
+        self._entries = {}
+        self._lock = threading.Lock()  # Scripts are assembled by many threads.
+        self.load()
+
+    def load(self) -> None:
+        """Load the manifest. Absent or broken manifest is empty."""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as mf:
+                manifest = json.load(mf)
+            if manifest["format"] == self.manifest_format:
+                self._entries = manifest["entries"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self._entries = {}
+
+    def save(self) -> None:
+        """Save the manifest. It is replaced only when it is written whole, so the interrupted run breaks nothing."""
+        with self._lock:
+            manifest = {"format": self.manifest_format, "entries": self._entries}
+            temp_file = "{}.{}.{}.tmp".format(self.manifest_file, os.getpid(), threading.get_ident())
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as mf:
+                    json.dump(manifest, mf, ensure_ascii=False, indent=1, sort_keys=True)
+                os.replace(temp_file, self.manifest_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+    def is_up_to_date(self, scr_file: str, txt_file: str, file_001: str, settings: tuple) -> bool:
+        """Check if the script need not to be assembled again.
+        scr_file -- assembled script.
+        txt_file -- text of the script.
+        file_001 -- 001's file of the script.
+        settings -- (version, bin encoding, txt encoding)."""
+        with self._lock:
+            entry = self._entries.get(self._get_key(scr_file))
+        if (entry is None) or (entry["settings"] != list(settings)):
+            return False
+        return ((self.get_hash(txt_file) == entry["txt"]) and (self.get_hash(scr_file) == entry["bin"]) and
+                ((entry["001"] is None) or (self.get_hash(file_001) == entry["001"])))
+
+    def record(self, scr_file: str, txt_hash: str, file_001: str, settings: tuple) -> None:
+        """Record the just assembled script.
+        scr_file -- assembled script.
+        txt_hash -- hash of the text as it was read for the assembling, or before it (see get_hash),
+        not after, as the text may be saved again while assembling.
+        file_001 -- 001's file of the script.
+        settings -- (version, bin encoding, txt encoding)."""
+        entry = {
+            "settings": list(settings),
+            "txt": txt_hash,
+            "bin": self.get_hash(scr_file),
+            "001": self.get_hash(file_001),
+        }
+        with self._lock:
+            self._entries[self._get_key(scr_file)] = entry
+
+    def forget(self, scr_file: str) -> None:
+        """Forget the script, so it would be assembled next time.
+        scr_file -- assembled script."""
+        with self._lock:
+            self._entries.pop(self._get_key(scr_file), None)
+
+    def _get_key(self, scr_file: str) -> str:
+        """Get the manifest's key of the script."""
+        return os.path.relpath(os.path.abspath(scr_file), self.output_directory).replace(os.sep, '/')
+
+    @classmethod
+    def get_hash(cls, file_name: str):
+        """Get hash of the file or None if there is no such file."""
+        try:
+            with open(file_name, 'rb') as hf:
+                return cls.get_data_hash(hf.read())
+        except OSError:
+            return None
+
+    @staticmethod
+    def get_data_hash(data: bytes) -> str:
+        """Get hash of the file's data."""
+        return hashlib.sha1(data).hexdigest()
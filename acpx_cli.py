@@ -0,0 +1,272 @@
+import os
+import sys
+import time
+import argparse
+import concurrent.futures
+import concurrent.futures.process
+from acpx_script import ACPXBinScript
+from acpx_build_manifest import ACPXBuildManifest
+from acpx_jobs import run_job
+
+
+class ACPXBatch:
+    """Headless disassembling and assembling of scripts on the pool of processes."""
+
+    format_name = "bin"
+    txt_extension = ".txt"
+    default_queue_factor = 4  # Submitted but not finished jobs per worker.
+
+    def __init__(self, workers: int = None, queue_size: int = None, version: str = None,
+                 bin_encoding: str = "cp932", txt_encoding: str = "cp932", cache: str = None,
+                 cache_size: int = None, ir_cache: bool = False, incremental: bool = False, verbose: bool = True,
+                 out=None) -> None:
+        """Initialize ACPXBatch class.
+        workers -- number of the worker processes (by default, number of CPUs).
+        queue_size -- maximum number of submitted but not finished jobs.
+        version -- version of the scripts.
+        bin_encoding -- encoding of the scripts.
+        txt_encoding -- encoding of the texts.
+        cache -- directory of the disassembly cache or None.
+        cache_size -- size cap of the disassembly cache in bytes.
+        ir_cache -- use sidecars of the texts for the assembling.
+        incremental -- skip the scripts, which are up to date by the build manifest (directory assembling).
+        verbose -- print status of every file.
+        out -- stream for the status (by default, stdout)."""
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.queue_size = queue_size if queue_size else self.workers * self.default_queue_factor
+        self.settings = {
+            "version": version,
+            "bin_encoding": bin_encoding,
+            "txt_encoding": txt_encoding,
+            "cache": cache,
+            "cache_size": cache_size,
+            "ir_cache": ir_cache,
+        }
+        self.incremental = incremental
+        self.verbose = verbose
+        self.out = out if out is not None else sys.stdout
+
+    def disassemble(self, scr_file: str, txt_file: str) -> bool:
+        """Disassemble the script or the directory of them and get True if there are no errors.
+        scr_file -- bin script or directory of them.
+        txt_file -- text or directory of them."""
+        if os.path.isdir(scr_file):
+            pairs = self.get_disassemble_pairs(scr_file, txt_file)
+        else:
+            pairs = [(os.path.abspath(scr_file), os.path.abspath(txt_file))]
+        return self._run("disassemble", pairs)
+
+    def assemble(self, txt_file: str, scr_file: str) -> bool:
+        """Assemble the script or the directory of them and get True if there are no errors.
+        txt_file -- text or directory of them.
+        scr_file -- bin script or directory of them."""
+        manifest = None
+        if os.path.isdir(txt_file):
+            pairs = self.get_assemble_pairs(txt_file, scr_file)
+            if self.incremental:
+                manifest = ACPXBuildManifest(scr_file)
+        else:
+            pairs = [(os.path.abspath(scr_file), os.path.abspath(txt_file))]
+        return self._run("assemble", pairs, manifest)
+
+    def _run(self, mode: str, pairs: list, manifest: ACPXBuildManifest = None) -> bool:
+        """Run the jobs on the pool and print the summary.
+        mode -- "disassemble" or "assemble".
+        pairs -- (bin script, text) of every job.
+        manifest -- build manifest to skip the up to date scripts and to record the assembled ones or None."""
+        start = time.perf_counter()
+        skipped = 0
+        if manifest is not None:
+            settings = (self.settings["version"], self.settings["bin_encoding"], self.settings["txt_encoding"])
+            all_number = len(pairs)
+            pairs = [(scr_file, txt_file) for scr_file, txt_file in pairs
+                     if not manifest.is_up_to_date(scr_file, txt_file, ACPXBinScript(scr_file).file_001, settings)]
+            skipped = all_number - len(pairs)
+
+        jobs = iter([(mode, scr_file, txt_file, self.settings) for scr_file, txt_file in pairs])
+        results = []
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            running = {}  # Future -> job.
+            while True:
+                for job in jobs:  # Bounded submission: not all jobs are pickled and queued at once.
+                    try:
+                        future = executor.submit(run_job, job)
+                    except concurrent.futures.process.BrokenProcessPool:  # A worker has died, the rest go to new pool.
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+                        future = executor.submit(run_job, job)
+                    running[future] = job
+                    if len(running) >= self.queue_size:
+                        break
+                if not running:
+                    break
+                done, not_done = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    job_mode, scr_file, txt_file, settings = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as ex:  # Broken pool and such: the job is failed, not the whole run.
+                        result = (scr_file, txt_file, str(ex), 0, None, None)
+                    results.append(result)
+                    self._report(mode, result, manifest)
+        finally:
+            executor.shutdown()
+        if manifest is not None:
+            manifest.save()
+
+        self._summarize(mode, results, skipped, time.perf_counter() - start)
+        return all(result[2] is None for result in results)
+
+    def _report(self, mode: str, result: tuple, manifest: ACPXBuildManifest) -> None:
+        """Print status of the file and record it in the manifest."""
+        scr_file, txt_file, error, size, cache_hit, txt_hash = result
+        if manifest is not None:
+            if error is None:
+                manifest.record(scr_file, txt_hash, ACPXBinScript(scr_file).file_001,
+                                (self.settings["version"], self.settings["bin_encoding"],
+                                 self.settings["txt_encoding"]))
+            else:
+                manifest.forget(scr_file)
+        if not self.verbose:
+            return
+        if error is None:
+            print("OK     {}{}".format(scr_file, " (cache)" if cache_hit else ""), file=self.out)
+        else:
+            print("FAILED {}: {}".format(scr_file, error), file=self.out)
+
+    def _summarize(self, mode: str, results: list, skipped: int, elapsed: float) -> None:
+        """Print the summary of the run."""
+        failed = [result for result in results if result[2] is not None]
+        size = sum(result[3] for result in results)
+        speed_elapsed = max(elapsed, 1e-9)
+        print("{}: {} files, {} succeed, {} failed, {} skipped in {:.3f} s ({:.1f} files/s, {:.2f} MB/s, {} workers)."
+              .format(mode.capitalize(), len(results), len(results) - len(failed), len(failed), skipped, elapsed,
+                      len(results) / speed_elapsed, size / speed_elapsed / 1024 / 1024, self.workers), file=self.out)
+        cache_results = [result[4] for result in results if result[4] is not None]
+        if cache_results:
+            hits = sum(cache_results)
+            print("Cache: {} hits, {} misses.".format(hits, len(cache_results) - hits), file=self.out)
+        for scr_file, txt_file, error, size, cache_hit, txt_hash in failed:
+            print("FAILED {}: {}".format(scr_file, error), file=self.out)
+
+    @classmethod
+    def get_disassemble_pairs(cls, scr_directory: str, txt_directory: str) -> list:
+        """Get (bin script, text) of every script in the directory, as the GUI does.
+        Only .bin files are scripts, not their .001 files, texts and such beside them."""
+        scr_directory = os.path.abspath(scr_directory)
+        txt_directory = os.path.abspath(txt_directory)
+        pairs = []
+        for root, dirs, files in os.walk(scr_directory):
+            for file_name in files:
+                if os.path.splitext(file_name)[1] != "." + cls.format_name:
+                    continue
+                basic_path = os.path.relpath(os.path.join(root, file_name), scr_directory)
+                pairs.append((os.path.join(scr_directory, basic_path),
+                              os.path.join(txt_directory, os.path.splitext(basic_path)[0] + ".txt")))
+        pairs.sort()
+        return pairs
+
+    @classmethod
+    def get_assemble_pairs(cls, txt_directory: str, scr_directory: str) -> list:
+        """Get (bin script, text) of every text in the directory, as the GUI does.
+        Only .txt files are texts, not the IR caches (.txt.acpxc) and such beside them."""
+        scr_directory = os.path.abspath(scr_directory)
+        txt_directory = os.path.abspath(txt_directory)
+        pairs = []
+        for root, dirs, files in os.walk(txt_directory):
+            for file_name in files:
+                if os.path.splitext(file_name)[1] != cls.txt_extension:
+                    continue
+                basic_path = os.path.relpath(os.path.join(root, file_name), txt_directory)
+                pairs.append((os.path.join(scr_directory, os.path.splitext(basic_path)[0] + "." + cls.format_name),
+                              os.path.join(txt_directory, basic_path)))
+        pairs.sort()
+        return pairs
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the parser of the command line."""
+    versions = [entry[0] for entry in ACPXBinScript.versions_lib]
+    parser = argparse.ArgumentParser(prog="ACPXScriptTool",
+                                     description="Headless (dis)assembling of ACPX scripts. "
+                                                 "Without arguments the GUI is started.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--version", choices=versions, default=ACPXBinScript.default_version,
+                        help="version of the scripts (default: %(default)s)")
+    common.add_argument("--bin-encoding", default="cp932", help="encoding of the scripts (default: %(default)s)")
+    common.add_argument("--txt-encoding", default="cp932", help="encoding of the texts (default: %(default)s)")
+    pool = argparse.ArgumentParser(add_help=False)
+    pool.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes (default: CPUs)")
+    pool.add_argument("--queue", type=int, default=None,
+                      help="maximum number of submitted jobs (default: {} per worker)".format(
+                          ACPXBatch.default_queue_factor))
+    pool.add_argument("-q", "--quiet", action="store_true", help="print the summary only")
+
+    disassemble = commands.add_parser("disassemble", parents=[common, pool],
+                                      help="disassemble the script or the directory of them")
+    disassemble.add_argument("bin", help="bin script or directory of them")
+    disassemble.add_argument("txt", help="text or directory of them")
+    disassemble.add_argument("--cache", default=None, metavar="DIR", help="directory of the disassembly cache")
+    disassemble.add_argument("--cache-size", type=int, default=None, metavar="BYTES",
+                             help="size cap of the disassembly cache")
+
+    assemble = commands.add_parser("assemble", parents=[common, pool],
+                                   help="assemble the script or the directory of them")
+    assemble.add_argument("txt", help="text or directory of them")
+    assemble.add_argument("bin", help="bin script or directory of them")
+    assemble.add_argument("--ir-cache", action="store_true", help="use .acpxc sidecars of the texts")
+    assemble.add_argument("--incremental", action="store_true",
+                          help="skip the scripts, which are up to date by the build manifest")
+
+    watch = commands.add_parser("watch", parents=[common], help="assemble the texts of the directory on save")
+    watch.add_argument("txt", help="directory of the texts")
+    watch.add_argument("bin", help="directory of the bin scripts")
+
+    serve = commands.add_parser("serve", help="start the resident local service (see acpx_service.py)")
+    serve.add_argument("--host", default=None, help="host to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=None, help="port to listen on (default: 57031)")
+    serve.add_argument("--socket", default=None, metavar="PATH",
+                       help="Unix socket to listen on instead (default without --host and --port: "
+                            "~/.acpx_service.sock where there are Unix sockets)")
+    serve.add_argument("--token", default=None,
+                       help="token, that the requests must have (default for TCP: random one, "
+                            "written to ~/.acpx_service_token)")
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """Run the command line and get the exit code."""
+    args = get_parser().parse_args(argv)
+
+    if args.command == "watch":
+        from acpx_watch import ACPXWatcher
+        ACPXWatcher(args.txt, args.bin, version=args.version, bin_encoding=args.bin_encoding,
+                    txt_encoding=args.txt_encoding).run()
+        return 0
+    if args.command == "serve":
+        from acpx_service import ACPXService
+        try:
+            ACPXService(host=args.host, port=args.port, unix_socket=args.socket,
+                        token=args.token).serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    batch = ACPXBatch(workers=args.workers, queue_size=args.queue, version=args.version,
+                      bin_encoding=args.bin_encoding, txt_encoding=args.txt_encoding,
+                      cache=getattr(args, "cache", None), cache_size=getattr(args, "cache_size", None),
+                      ir_cache=getattr(args, "ir_cache", False), incremental=getattr(args, "incremental", False),
+                      verbose=not args.quiet)
+    if args.command == "disassemble":
+        status = batch.disassemble(args.bin, args.txt)
+    else:
+        status = batch.assemble(args.txt, args.bin)
+    return 0 if status else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,91 @@
 import struct
 
+try:
+    import numpy
+except ImportError:  # NumPy is optional, it only speeds up the big string blocks.
+    numpy = None
+
+
+class ACPXCommand:
+    """Compiled entry of the command library."""
+
+    __slots__ = ("index", "opcode", "byte", "arguments", "name", "true_name", "args_len", "offset_fields",
+                 "args_struct", "string_fields", "label_fields", "arg_fields", "code_struct")
+
+    def __init__(self, index: int, opcode: str, arguments: str, name: str, args_len: int,
+                 offset_fields: tuple, args_codec: tuple) -> None:
+        """index -- index of the command in command_library.
+        opcode -- hex name of the command.
+        arguments -- structure of arguments.
+        name -- visible name of the command.
+        args_len -- length of the arguments in bytes.
+        offset_fields -- (position in the arguments, struct definer) of every offset argument.
+        args_codec -- (struct.Struct of the arguments, string fields, label fields, argument fields)."""
+        self.index = index
+        self.opcode = opcode
+        self.byte = int(opcode, 16)
+        self.arguments = arguments
+        self.name = name
+        self.true_name = name if name else opcode
+        self.args_len = args_len
+        self.offset_fields = offset_fields
+        self.args_struct, self.string_fields, self.label_fields, self.arg_fields = args_codec
+        self.code_struct = self.get_code_struct(self.args_struct)
+
+    @staticmethod
+    def get_code_struct(args_struct):
+        """Get struct of the opcode and the arguments at once, for the assembling."""
+        if isinstance(args_struct, ACPXSegmentedStruct):
+            first_format = args_struct.formats[0]
+            return ACPXSegmentedStruct((first_format[0] + 'B' + first_format[1:],) + args_struct.formats[1:])
+        args_format = args_struct.format
+        return struct.Struct(args_format[0] + 'B' + args_format[1:])
+
+
+class ACPXSegmentedStruct:
+    """Struct of the fields with different byte orders, as struct.Struct may have only one.
+    Every run of the fields with the same byte order is a struct.Struct of its own."""
+
+    __slots__ = ("formats", "segments", "field_numbers", "size")
+
+    def __init__(self, formats: tuple) -> None:
+        """formats -- struct format of every segment, with its byte order."""
+        self.formats = tuple(formats)
+        self.segments = tuple(struct.Struct(segment_format) for segment_format in self.formats)
+        self.field_numbers = tuple(len(segment.unpack(bytes(segment.size))) for segment in self.segments)
+        self.size = sum(segment.size for segment in self.segments)
+
+    def unpack(self, data) -> tuple:
+        """Unpack the data of exactly the struct's size."""
+        if len(data) != self.size:
+            raise struct.error("unpack requires a buffer of {} bytes".format(self.size))
+        return self.unpack_from(data)
+
+    def unpack_from(self, buffer, offset: int = 0) -> tuple:
+        """Unpack the struct from the buffer at the offset."""
+        values = []
+        for segment in self.segments:
+            values.extend(segment.unpack_from(buffer, offset))
+            offset += segment.size
+        return tuple(values)
+
+    def pack(self, *values) -> bytes:
+        """Pack the values."""
+        buffer = bytearray(self.size)
+        self.pack_into(buffer, 0, *values)
+        return bytes(buffer)
+
+    def pack_into(self, buffer, offset: int, *values) -> None:
+        """Pack the values into the buffer at the offset."""
+        if len(values) != sum(self.field_numbers):
+            raise struct.error("pack expected {} items for packing (got {})".format(sum(self.field_numbers),
+                                                                                   len(values)))
+        field = 0
+        for segment, field_number in zip(self.segments, self.field_numbers):
+            segment.pack_into(buffer, offset, *values[field:field + field_number])
+            offset += segment.size
+            field += field_number
+
 
 class ACPXCommandLib:
     # Library.
@@ -18,6 +104,15 @@ class ACPXCommandLib:
     O_instances = ('O',)
     offsets_library = ('O', 'I')
 
+    commands = ()  # ACPXCommand of every command_library entry.
+    dispatch_table = ()  # Byte-indexed ACPXCommand table, compiled from command_library.
+    commands_by_name = {}  # Opcode or visible name -> ACPXCommand.
+    args_codecs = {}  # Structure of arguments -> (struct, string fields, label fields, argument fields).
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.compile_library()
+
     def __init__(self, bin_encoding: str, txt_encoding: str, string_bank: tuple = None, offset_bank: tuple = None,
                  label_definer: tuple = None, offset_beginner: int = 0):
         """bin_encoding -- encoding of the bin script.
@@ -36,8 +131,10 @@ class ACPXCommandLib:
         self.txt_encoding = txt_encoding
         self.string_bank = string_bank
         self._offset_bank = offset_bank
-        self.label_definer = label_definer
+        self._label_definer = label_definer
         self.offset_beginner = offset_beginner
+        self._offset_labels = None  # Offset -> label, built on demand.
+        self._label_offsets = None  # Label -> offset, built on demand.
 
     # Properties.
 
@@ -48,10 +145,62 @@ class ACPXCommandLib:
     @offset_bank.setter
     def offset_bank(self, value):
         self._offset_bank = value
+        self._reset_label_maps()
 
     @offset_bank.deleter
     def offset_bank(self):
         self._offset_bank = tuple()
+        self._reset_label_maps()
+
+    @property
+    def label_definer(self):
+        return self._label_definer
+
+    @label_definer.setter
+    def label_definer(self, value):
+        self._label_definer = value
+        self._reset_label_maps()
+
+    # Labels.
+
+    def _reset_label_maps(self) -> None:
+        """Drop offset <-> label maps after the change of the offset bank or the label definer."""
+        self._offset_labels = None
+        self._label_offsets = None
+
+    def _build_label_maps(self) -> None:
+        """Build offset <-> label maps. As with list.index, the first entry wins."""
+        offset_labels = {}
+        label_offsets = {}
+        for offset, label in zip(self._offset_bank, self._label_definer):
+            offset_labels.setdefault(offset, label)
+            label_offsets.setdefault(label, offset)
+        self._offset_labels = offset_labels
+        self._label_offsets = label_offsets
+
+    def get_label(self, offset: int):
+        """Get label definition of the absolute offset."""
+        if self._offset_labels is None:
+            self._build_label_maps()
+        try:
+            return self._offset_labels[offset]
+        except KeyError:
+            raise ValueError("No label for offset {}!".format(offset)) from None
+
+    def get_label_offset(self, label) -> int:
+        """Get absolute offset of the label definition."""
+        if self._label_offsets is None:
+            self._build_label_maps()
+        try:
+            return self._label_offsets[label]
+        except KeyError:
+            raise ValueError("No such label: {}!".format(label)) from None
+
+    def get_sorted_labels(self) -> list:
+        """Get (offset, label) pairs sorted by offset, for the labels emitting while streaming."""
+        if self._offset_labels is None:
+            self._build_label_maps()
+        return sorted(self._offset_labels.items(), key=lambda pair: pair[0])
 
     # Structs.
 
@@ -59,31 +208,35 @@ class ACPXCommandLib:
 
     def get_args(self, in_file, args: str) -> list:
         """Extract arguments from the file."""
-        arguments_list = []
-        appendix = ""
-        for argument in args:
-            if argument in self.technical_instances:
-                appendix = argument
-            elif argument in self.Q_instances:
-                result = self.get_Q(in_file, appendix + argument)
-                arguments_list.append(result)
-            elif argument in self.I_instances:
-                result = self.get_I(in_file, appendix + argument)
-                arguments_list.append(result)
-            elif argument in self.H_instances:
-                result = self.get_H(in_file, appendix + argument)
-                arguments_list.append(result)
-            elif argument in self.B_instances:
-                result = self.get_B(in_file, appendix + argument)
-                arguments_list.append(result)
-            elif argument in self.s_instances:
-                result = self.get_s(in_file)
-                arguments_list.append(result)
-            elif argument in self.O_instances:
-                result = self.get_O(in_file)
-                arguments_list.append(result)
+        args_struct, string_fields, label_fields, arg_fields = self.get_args_codec(args)
+        arguments_list = list(args_struct.unpack(in_file.read(args_struct.size)))
+        return self.resolve_args(arguments_list, string_fields, label_fields)
+
+    def get_command_args(self, buffer, position: int, command) -> list:
+        """Extract arguments of the compiled command from the buffer.
+        buffer -- bytes-like object with the code.
+        position -- position of the arguments in the buffer.
+        command -- compiled command (ACPXCommand)."""
+        arguments_list = list(command.args_struct.unpack_from(buffer, position))
+        return self.resolve_args(arguments_list, command.string_fields, command.label_fields)
+
+    def resolve_args(self, arguments_list: list, string_fields: tuple, label_fields: tuple) -> list:
+        """Resolve linked strings and offsets in the list of unpacked arguments."""
+        for field in string_fields:
+            arguments_list[field] = self.resolve_s(arguments_list[field])
+        for field in label_fields:
+            arguments_list[field] = self.resolve_O(arguments_list[field])
         return arguments_list
 
+    def resolve_s(self, str_num: int) -> str:
+        """Get linked string by its number."""
+        return self.string_bank[str_num]
+
+    def resolve_O(self, offset: int) -> str:
+        """Get label string by offset from the code block's beginning."""
+        offset_string = "*{}".format(self.get_label(offset + self.offset_beginner))
+        return offset_string
+
     @staticmethod
     def get_B(file_in, definer: str) -> int:
         """Extract B/b structure."""
@@ -111,25 +264,54 @@ class ACPXCommandLib:
     def get_s(self, file_in) -> str:
         """Extract linked string from file."""
         str_num = self.get_I(file_in, 'I')
-        string = self.string_bank[str_num]
-        return string
+        return self.resolve_s(str_num)
 
     @staticmethod
     def get_S(in_file, encoding: str) -> str:
         """Extract string from the file."""
-        string = b''
-        byte = in_file.read(1)
-        while byte != b'\x00':
-            string += byte
-            byte = in_file.read(1)
+        string = ACPXCommandLib.read_until(in_file, b'\x00')
         return string.decode(encoding)
 
+    @staticmethod
+    def get_S_from(buffer, position: int, encoding: str) -> str:
+        """Extract string from the buffer.
+        buffer -- bytes-like object with find (bytes, bytearray, mmap).
+        position -- position of the string in the buffer."""
+        return ACPXCommandLib.get_plain_S(buffer, position, encoding)
+
+    @staticmethod
+    def get_plain_S(buffer, position: int, encoding: str) -> str:
+        """Extract not obfuscated null-terminated string from the buffer."""
+        end = buffer.find(b'\x00', position)
+        if end == -1:  # No terminator at the end of the data.
+            end = len(buffer)
+        return bytes(buffer[position:end]).decode(encoding)
+
+    @staticmethod
+    def decode_strings_block(block) -> bytes:
+        """Get not obfuscated strings block."""
+        return bytes(block)
+
+    @staticmethod
+    def read_until(in_file, terminator: bytes, chunk_size: int = 256) -> bytes:
+        """Read the file by chunks up to the terminator and leave the file right after it."""
+        chunks = []
+        while True:
+            chunk = in_file.read(chunk_size)
+            if not chunk:  # No terminator at the end of the file.
+                break
+            end = chunk.find(terminator)
+            if end != -1:
+                chunks.append(chunk[:end])
+                in_file.seek(end + 1 - len(chunk), 1)
+                break
+            chunks.append(chunk)
+        return b''.join(chunks)
+
     def get_O(self, file_in) -> str:
         """Extract offset from the file."""
-        offset = self.get_I(file_in, 'I') + self.offset_beginner
-        offset_num = self.offset_bank.index(offset)
-        offset_string = "*{}".format(self.label_definer[offset_num])
-        return offset_string
+        offset = self.get_I(file_in, 'I')
+        return self.resolve_O(offset)
 
     @classmethod
     def get_len_from_structure(cls, stru):
@@ -159,28 +341,38 @@ class ACPXCommandLib:
 
     def set_args(self, argument_list: list, args: str) -> bytes:
         """Set arguments."""
-        args_bytes = b''
-        appendix = ""
-        current_argument = 0
-        for argument in args:
-            if argument in self.technical_instances:
-                appendix = argument
-                continue
-            # Argument number changing.
-            if argument in self.Q_instances:
-                args_bytes += self.set_Q(argument_list[current_argument], appendix + argument)
-            if argument in self.I_instances:
-                args_bytes += self.set_I(argument_list[current_argument], appendix + argument)
-            elif argument in self.H_instances:
-                args_bytes += self.set_H(argument_list[current_argument], appendix + argument)
-            elif argument in self.B_instances:
-                args_bytes += self.set_B(argument_list[current_argument], appendix + argument)
-            elif argument in self.s_instances:
-                args_bytes += self.set_s(argument_list[current_argument], self.bin_encoding)
-            elif argument in self.O_instances:
-                args_bytes += self.set_O(argument_list[current_argument])
-            current_argument += 1  # Since argument may not change with new command.
-        return args_bytes
+        args_struct, string_fields, label_fields, arg_fields = self.get_args_codec(args)
+        values = self.link_args(argument_list, string_fields, label_fields, arg_fields)
+        return args_struct.pack(*values)
+
+    def set_command(self, buffer: bytearray, position: int, command, argument_list: list) -> int:
+        """Pack the compiled command with its arguments into the buffer and return the position after it.
+        buffer -- preallocated buffer of the code.
+        position -- position of the command in the buffer.
+        command -- compiled command (ACPXCommand).
+        argument_list -- arguments of the command."""
+        values = self.link_args(argument_list, command.string_fields, command.label_fields, command.arg_fields)
+        command.code_struct.pack_into(buffer, position, command.byte, *values)
+        return position + command.code_struct.size
+
+    def link_args(self, argument_list: list, string_fields: tuple, label_fields: tuple, arg_fields: tuple) -> list:
+        """Get struct values from the arguments, linking strings and offsets."""
+        values = [argument_list[field] for field in arg_fields]
+        for field in string_fields:
+            values[field] = self.link_s(values[field])
+        for field in label_fields:
+            values[field] = self.link_O(values[field])
+        return values
+
+    def link_s(self, arg: str) -> int:
+        """Add string to the string bank and get its number."""
+        str_number = len(self.string_bank)
+        self.string_bank.append(arg)
+        return str_number
+
+    def link_O(self, arg: str) -> int:
+        """Get offset from the code block's beginning by the label string."""
+        return self.get_label_offset(arg[1:]) - self.offset_beginner
 
     @staticmethod
     def set_B(arg: int, definer: str) -> bytes:
@@ -203,9 +395,7 @@ class ACPXCommandLib:
 
     def set_s(self, arg: str, encoding: str) -> bytes:
         """Set linked string structure."""
-        str_number = len(self.string_bank)
-        self.string_bank.append(arg)
-        arg_bytes = self.set_I(str_number, 'I')
+        arg_bytes = self.set_I(self.link_s(arg), 'I')
         return arg_bytes
 
     @staticmethod
@@ -214,14 +404,115 @@ class ACPXCommandLib:
         arg_bytes = arg.encode(encoding) + b'\x00'
         return arg_bytes
 
+    @staticmethod
+    def set_plain_S(arg: str, encoding: str) -> bytes:
+        """Set not obfuscated null-terminated string structure."""
+        return arg.encode(encoding) + b'\x00'
+
+    @staticmethod
+    def encode_strings_block(block: bytes) -> bytes:
+        """Get strings block as it is stored in the script."""
+        return block
+
     def set_O(self, arg: str) -> bytes:
         """Set offset structure."""
-        offset_num = arg[1:]
-        offset_index = self.label_definer.index(offset_num)
-        offset = self.offset_bank[offset_index] - self.offset_beginner
-        result = self.set_I(offset, 'I')
+        result = self.set_I(self.link_O(arg), 'I')
         return result
 
+    # Library compilation.
+
+    @classmethod
+    def compile_library(cls) -> None:
+        """Compile command_library into the byte-indexed dispatch table.
+        Called once on the class creation, so the disassembler gets a command with a single list index."""
+        cls.args_codecs = {}
+        cls.commands = tuple(ACPXCommand(index, opcode, arguments, name,
+                                         cls.get_len_from_structure(arguments),
+                                         cls.get_offset_fields(arguments),
+                                         cls.get_args_codec(arguments))
+                             for index, (opcode, arguments, name) in enumerate(cls.command_library))
+
+        dispatch_table = [None] * 256
+        commands_by_name = {}
+        for command in cls.commands:  # The first entry wins, as in the linear search.
+            if dispatch_table[command.byte] is None:
+                dispatch_table[command.byte] = command
+            commands_by_name.setdefault(command.opcode, command)
+        for command in cls.commands:  # Opcodes are searched before the visible names.
+            commands_by_name.setdefault(command.name, command)
+        cls.dispatch_table = tuple(dispatch_table)
+        cls.commands_by_name = commands_by_name
+
+    @classmethod
+    def get_args_codec(cls, stru: str) -> tuple:
+        """Get (struct, string fields, label fields, argument fields) of known structure -- stru.
+        The struct decodes and encodes all the arguments at once, string and label fields are the numbers
+        of the linked strings and offsets to resolve after the unpacking, argument fields are the numbers
+        of the arguments in the disassembled list for every struct field.
+        The struct is struct.Struct or, if the structure mixes byte orders, ACPXSegmentedStruct."""
+        codec = cls.args_codecs.get(stru)
+        if codec is not None:
+            return codec
+
+        byte_orders = []  # Of every struct field.
+        formats = []
+        string_fields = []
+        label_fields = []
+        arg_fields = []
+        prefix = ''
+        current_argument = -1
+        for structer in stru:
+            if structer in cls.technical_instances:
+                prefix = structer
+                continue
+            current_argument += 1  # Since argument may not change with new command.
+            if structer in cls.s_instances:
+                string_fields.append(len(formats))
+                byte_orders.append('=')  # Linked strings and offsets are always native.
+                formats.append('I')
+            elif structer in cls.O_instances:
+                label_fields.append(len(formats))
+                byte_orders.append('=')
+                formats.append(cls.offsets_library[1])
+            elif structer in (cls.Q_instances + cls.I_instances + cls.H_instances + cls.B_instances):
+                byte_orders.append(prefix or '=')  # Native byte order and standard sizes without the prefix.
+                formats.append(structer)
+            elif structer in cls.S_instances:
+                raise TypeError("Incorrect struct type: S!")
+            else:
+                continue
+            arg_fields.append(current_argument)
+
+        segments = []  # Runs of the fields with the same byte order.
+        for byte_order, field_format in zip(byte_orders, formats):
+            if segments and segments[-1][0] == byte_order:
+                segments[-1] += field_format
+            else:
+                segments.append(byte_order + field_format)
+        if len(segments) > 1:
+            args_struct = ACPXSegmentedStruct(segments)
+        else:
+            args_struct = struct.Struct(segments[0] if segments else '=')
+
+        codec = (args_struct, tuple(string_fields), tuple(label_fields), tuple(arg_fields))
+        cls.args_codecs[stru] = codec
+        return codec
+
+    @classmethod
+    def get_offset_fields(cls, stru: str) -> tuple:
+        """Get (position, struct definer) of every offset in known structure -- stru."""
+        fields = []
+        position = 0
+        prefix = ''
+        for structer in stru:
+            if structer in cls.technical_instances:
+                prefix = structer
+                continue
+            if structer in cls.O_instances:
+                fields.append((position, prefix + cls.offsets_library[1]))
+            position += cls.get_len_from_structure(structer)
+        return tuple(fields)
+
     # Just a simple methods.
 
     @classmethod
@@ -229,13 +520,10 @@ class ACPXCommandLib:
         """Get index of command in command_library.
         command -- normal name of command.
         For normal name see "get_true_name"."""
-        for i in range(len(cls.command_library)):
-            if command == cls.command_library[i][0]:
-                return i
-        for i in range(len(cls.command_library)):
-            if command == cls.command_library[i][2]:
-                return i
-        return -1
+        command = cls.commands_by_name.get(command)
+        if command is None:
+            return -1
+        return command.index
 
     @classmethod
     def find_command_index(cls, byer) -> int:
@@ -248,14 +536,17 @@ class ACPXCommandLib:
         else:
             raise TypeError("Incorrect type: " + str(type(byer)) +
                             "!\nНекорректный тип: " + str(type(byer)) + "!")
-        hexer = cls.to_fully_hex(nou)
+        command = cls.find_command(nou)
+        if command is None:
+            return -1
+        return command.index
 
-        result = -1
-        for i in range(len(cls.command_library)):
-            if hexer == cls.command_library[i][0]:
-                result = i
-                break
-        return result
+    @classmethod
+    def find_command(cls, byte: int):
+        """Find compiled command (ACPXCommand) from the byte or None if there is no such command."""
+        if 0 <= byte < len(cls.dispatch_table):
+            return cls.dispatch_table[byte]
+        return None
 
     @classmethod
     def get_true_name(cls, index: int) -> str:
@@ -323,6 +614,9 @@ class ACPXCommandLib:
         return strings
 
 
+ACPXCommandLib.compile_library()
+
+
 class ACPXCommandLibVer1_00(ACPXCommandLib):
     command_library = (
         ('00', '', 'NULL'),
@@ -426,6 +720,10 @@ class ACPXCommandLibVer1_00(ACPXCommandLib):
 
 
 class ACPXCommandLibVerNEW(ACPXCommandLibVer1_00):
+    xor_key = 0x55  # Strings obfuscation.
+    xor_table = bytes(byte ^ 0x55 for byte in range(256))  # Translation table of xor_key.
+    numpy_xor_threshold = 1 << 16  # Smaller blocks are faster with bytes.translate.
+
     command_library = (  # Completely new opcodes?
         ('01', '', ''),
         ('02', 'I', ''),
@@ -475,32 +773,46 @@ class ACPXCommandLibVerNEW(ACPXCommandLibVer1_00):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    @staticmethod
-    def get_S(in_file, encoding: str) -> str:
+    @classmethod
+    def get_S(cls, in_file, encoding: str) -> str:
         """Extract string from the file."""
+        string = cls.read_until(in_file, b'\x55')
+        return cls.xor_block(string).decode(encoding)
 
-        string = b''
-        byte = in_file.read(1)
-        while byte != b'\x55':
-            int_byte = byte[0] ^ 0x55
-            byte = int_byte.to_bytes(1, 'little')
-            string += byte
-            byte = in_file.read(1)
-        return string.decode(encoding)
+    @classmethod
+    def get_S_from(cls, buffer, position: int, encoding: str) -> str:
+        """Extract string from the buffer.
+        buffer -- bytes-like object with find (bytes, bytearray, mmap).
+        position -- position of the string in the buffer."""
+        end = buffer.find(b'\x55', position)
+        if end == -1:  # No terminator at the end of the data.
+            end = len(buffer)
+        return cls.xor_block(buffer[position:end]).decode(encoding)
 
-    @staticmethod
-    def set_S(arg: str, encoding: str) -> bytes:
+    @classmethod
+    def set_S(cls, arg: str, encoding: str) -> bytes:
         """Set string structure."""
-        arg_bytes = arg.encode(encoding) + b'\x00'
-        new_arg_bytes = b''
-        for byte in arg_bytes:
-            new_byte = byte ^ 0x55
-            new_arg_bytes += new_byte.to_bytes(1, 'little')
-        return new_arg_bytes
+        return cls.xor_block(arg.encode(encoding) + b'\x00')
 
-    def set_s(self, arg: str, encoding: str) -> bytes:
-        """Set linked string structure."""
+    @classmethod
+    def decode_strings_block(cls, block) -> bytes:
+        """Get not obfuscated strings block."""
+        return cls.xor_block(block)
+
+    @classmethod
+    def encode_strings_block(cls, block: bytes) -> bytes:
+        """Get strings block as it is stored in the script."""
+        return cls.xor_block(block)
+
+    @classmethod
+    def xor_block(cls, block) -> bytes:
+        """XOR every byte of the block with the key, in one shot."""
+        if (numpy is not None) and (len(block) >= cls.numpy_xor_threshold):
+            return numpy.bitwise_xor(numpy.frombuffer(block, dtype=numpy.uint8), cls.xor_key).tobytes()
+        return bytes(block).translate(cls.xor_table)
+
+    def link_s(self, arg: str) -> int:
+        """Add string to the string bank and get its number."""
         str_number = len(self.string_bank) - 1
         self.string_bank.append(arg)
-        arg_bytes = self.set_I(str_number, 'I')
-        return arg_bytes
\ No newline at end of file
+        return str_number
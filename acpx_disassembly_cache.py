@@ -0,0 +1,111 @@
+import os
+import shutil
+import hashlib
+import threading
+
+
+class ACPXDisassemblyCache:
+    """On-disk cache of disassembled texts, addressed by the content of the scripts and the settings.
+    Least recently used texts are evicted, when the cache is bigger than its size cap."""
+
+    default_directory = os.path.join(os.path.expanduser("~"), ".acpx_cache")
+    default_max_size = 256 * 1024 * 1024  # In bytes.
+    cache_format = 1  # Change on any change of the disassembler's output.
+    entry_extension = ".txt"
+
+    def __init__(self, directory: str = None, max_size: int = None) -> None:
+        """Initialize ACPXDisassemblyCache class.
+        directory -- directory of the cache.
+        max_size -- size cap of the cache in bytes."""
+        self.directory = directory if directory is not None else self.default_directory
+        self.max_size = max_size if max_size is not None else self.default_max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(self, bin_data: bytes, data_001: bytes, settings: tuple) -> str:
+        """Get the key of the disassembled text.
+        bin_data -- data of the bin script.
+        data_001 -- data of 001's file or None.
+        settings -- everything else that changes the text: version, encodings, debug flag..."""
+        hasher = hashlib.sha1()
+        hasher.update(repr((self.cache_format, len(bin_data), data_001 is not None, settings)).encode('utf-8'))
+        hasher.update(bin_data)
+        if data_001 is not None:
+            hasher.update(data_001)
+        return hasher.hexdigest()
+
+    def load(self, key: str, txt_file: str) -> bool:
+        """Copy the cached text to the file and get True, or get False if there is no such text.
+        key -- key of the text.
+        txt_file -- name of the text file."""
+        entry_file = self._get_entry_file(key)
+        try:
+            ef = open(entry_file, 'rb')
+        except FileNotFoundError:  # Only the absent text is the miss, errors of txt_file are not.
+            with self._lock:
+                self.misses += 1
+            return False
+        with ef:
+            with open(txt_file, 'wb') as tf:
+                shutil.copyfileobj(ef, tf)
+        try:
+            os.utime(entry_file)  # Recently used.
+        except FileNotFoundError:  # Evicted by another process meanwhile.
+            pass
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, txt_file: str) -> None:
+        """Put the text in the cache and evict the least recently used texts over the size cap.
+        key -- key of the text.
+        txt_file -- name of the text file."""
+        entry_file = self._get_entry_file(key)
+        temp_file = "{}.{}.{}.tmp".format(entry_file, os.getpid(), threading.get_ident())
+        shutil.copyfile(txt_file, temp_file)
+        os.replace(temp_file, entry_file)  # Other processes see the whole text or nothing.
+        self.evict()
+
+    def evict(self) -> None:
+        """Evict the least recently used texts until the cache fits the size cap."""
+        with self._lock:
+            entries = []
+            total_size = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(self.entry_extension):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # Evicted by another process.
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+            entries.sort()
+            for mtime, size, path in entries:
+                if total_size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_size -= size
+
+    def clear(self) -> None:
+        """Remove all cached texts."""
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self.entry_extension):
+                    os.remove(entry.path)
+
+    def get_stats(self) -> dict:
+        """Get hits, misses, number of cached texts and their size."""
+        entries = [entry.stat().st_size for entry in os.scandir(self.directory)
+                   if entry.name.endswith(self.entry_extension)]
+        return {"hits": self.hits, "misses": self.misses, "entries": len(entries), "size": sum(entries)}
+
+    def _get_entry_file(self, key: str) -> str:
+        """Get name of the cached text's file."""
+        return os.path.join(self.directory, key + self.entry_extension)
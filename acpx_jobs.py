@@ -0,0 +1,51 @@
+import os
+from acpx_script import ACPXBinScript
+from acpx_build_manifest import ACPXBuildManifest
+from acpx_disassembly_cache import ACPXDisassemblyCache
+
+
+# Jobs of the worker processes, shared by the command line (acpx_cli.py) and the GUI.
+# Jobs and their results are plain tuples, so they are cheap to pickle.
+
+
+def run_job(job: tuple) -> tuple:
+    """Disassemble or assemble one script. Runs in the worker process.
+    job -- (mode, bin script, text, settings as the dict).
+    Returns...
+    (bin script, text, error message or None, size of the input in bytes, cache hit or None,
+    hash of the text before the assembling or None)"""
+    mode, scr_file, txt_file, settings = job
+    size = 0
+    cache_hit = None
+    txt_hash = None
+    try:
+        script_obj = ACPXBinScript(scr_file, txt_file, version=settings["version"],
+                                   bin_encoding=settings["bin_encoding"], txt_encoding=settings["txt_encoding"])
+        if mode == "disassemble":
+            size = os.path.getsize(scr_file)
+            if script_obj.version == "ESCR_NEW" and os.path.exists(script_obj.file_001):
+                size += os.path.getsize(script_obj.file_001)
+            os.makedirs(os.path.dirname(txt_file), exist_ok=True)
+            cache = None
+            if settings["cache"] is not None:
+                cache = ACPXDisassemblyCache(settings["cache"], settings["cache_size"])
+            script_obj.disassemble(cache=cache)
+            if cache is not None:
+                cache_hit = cache.hits > 0
+        else:
+            size = os.path.getsize(txt_file)
+            txt_hash = ACPXBuildManifest.get_hash(txt_file)  # Before, so the text saved meanwhile is not skipped.
+            os.makedirs(os.path.dirname(scr_file), exist_ok=True)
+            script_obj.assemble(ir_cache=settings["ir_cache"])
+    except Exception as ex:
+        return scr_file, txt_file, str(ex), size, cache_hit, txt_hash
+    return scr_file, txt_file, None, size, cache_hit, txt_hash
+
+
+def check_job(job: tuple) -> list:
+    """Get (bin script, text) of the scripts, that are not up to date in the manifest. Runs in the worker process.
+    job -- (directory with the assembled scripts, (bin script, text) of every file, settings as the tuple)."""
+    output_directory, pairs, settings = job
+    manifest = ACPXBuildManifest(output_directory)
+    return [(scr_file, txt_file) for scr_file, txt_file in pairs
+            if not manifest.is_up_to_date(scr_file, txt_file, ACPXBinScript(scr_file).file_001, settings)]
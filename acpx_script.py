@@ -1,6 +1,13 @@
+import io
+import os
+import re
+import hashlib
+import marshal
+import contextlib
+import threading
 import struct
 import json
-from acpx_command_lib import ACPXCommandLibVer1_00, ACPXCommandLibVerNEW
+from acpx_command_lib import ACPXCommandLib, ACPXCommandLibVer1_00, ACPXCommandLibVerNEW
 
 
 # Made by Tester.
@@ -17,6 +24,78 @@ from acpx_command_lib import ACPXCommandLibVer1_00, ACPXCommandLibVerNEW
 # #
 
 
+class ACPXStringBank:
+    """Lazy string bank of the script.
+    Strings are decoded (and converted) only when they are needed first, and remembered after that."""
+
+    def __init__(self, block: bytes, string_offsets: tuple, encoding: str, base: int = 0, converter=None) -> None:
+        """block -- not obfuscated data with the strings.
+        string_offsets -- offsets of the strings from the base.
+        encoding -- encoding of the strings.
+        base -- offset of the strings section in the block.
+        converter -- function to apply to every decoded string or None."""
+        self._block = block
+        self._string_offsets = string_offsets
+        self._encoding = encoding
+        self._base = base
+        self._converter = converter
+        self._strings = [None] * len(string_offsets)
+
+    def __len__(self) -> int:
+        return len(self._string_offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(len(self))))
+        string = self._strings[index]
+        if string is None:
+            string = ACPXCommandLib.get_plain_S(self._block, self._base + self._string_offsets[index], self._encoding)
+            if self._converter is not None:
+                string = self._converter(string)
+            self._strings[index] = string
+        return string
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ACPXInstruction:
+    """Parsed instruction of the disassembled text."""
+
+    __slots__ = ("command", "arguments", "line")
+
+    def __init__(self, command, arguments, line: int) -> None:
+        """command -- compiled command (ACPXCommand) or None for free bytes.
+        arguments -- list of the command's arguments or free bytes.
+        line -- number of the line of the arguments (or of the free bytes) in the text."""
+        self.command = command
+        self.arguments = arguments
+        self.line = line
+
+
+class ACPXDecodedInstruction:
+    """Decoded instruction of the bin script."""
+
+    __slots__ = ("offset", "opcode", "name", "arguments", "label")
+
+    def __init__(self, offset: int, opcode: str, name: str, arguments, label) -> None:
+        """offset -- offset of the instruction in the bin script.
+        opcode -- hex name of the command or None for free bytes.
+        name -- visible name of the command (see "get_true_name") or None for free bytes.
+        arguments -- list of the command's arguments (strings and labels resolved) or free bytes.
+        label -- label of the instruction or None if there is no label."""
+        self.offset = offset
+        self.opcode = opcode
+        self.name = name
+        self.arguments = arguments
+        self.label = label
+
+    def __repr__(self) -> str:
+        return "ACPXDecodedInstruction({!r}, {!r}, {!r}, {!r}, {!r})".format(
+            self.offset, self.opcode, self.name, self.arguments, self.label)
+
+
 class ACPXBinScript:
     versions_lib = (
         ("ESCR1_00", ACPXCommandLibVer1_00),
@@ -28,10 +107,31 @@ class ACPXBinScript:
         "internal": '!?｡｢｣､･ｦｧｨｩｪｫｬｭｮｯｰｱｲｳｴｵｶｷｸｹｺｻｼｽｾｿﾀﾁﾂﾃﾄﾅﾆﾇﾈﾉﾊﾋﾌﾍﾎﾏﾐﾑﾒﾓﾔﾕﾖﾗﾘﾙﾚﾛﾜﾝﾞﾟ',
         "external": '！？　。「」、…をぁぃぅぇぉゃゅょっーあいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん゛゜',
     }
-
-    def __init__(self, bin_file: str, txt_file: str, bin_encoding: str = "cp932", txt_encoding: str = "cp932",
-                 version: str = None, debug: bool = False) -> None:
+    _string_tables = {}  # (inner, outer) -> str.translate table, compiled on the first restring.
+    text_chunk_lines = 4096  # Disassembled lines written at once.
+    ir_cache_extension = ".acpxc"  # Sidecar of the text with its parsed instructions.
+    ir_cache_format = 6  # Change on any change of the sidecar's contents.
+    # Sidecar: magic, format, length and digest of the head, length and digest of the parsed text, then they.
+    # Marshal is not safe against the broken data, so the data, which does not fit its digest, is a miss.
+    _ir_cache_header = struct.Struct('<5sBI20sI20s')
+    _ir_cache_magic = b'ACPXC'
+
+    # Front end of the disassembled text.
+    # Usual lines: free bytes as written by the disassembler and the command's name.
+    # Unusual lines (by hand, with debug offsets...) are parsed the old, slow way.
+    _line_re = re.compile(r'#0>([0-9a-fA-F]{2}(?: [0-9a-fA-F]{2})*)$|#1>([^ >]*)')
+    # Usual arguments: [], [int], [int, int...], ["string"], ["string", int]. Others are given to json.
+    _args_re = re.compile(r'\[(?:"([^"\\\x00-\x1f]*)"(?:, (-?(?:0|[1-9][0-9]*)))?'
+                          r'|(-?(?:0|[1-9][0-9]*)(?:, -?(?:0|[1-9][0-9]*))*))?\][ \t\n\r]*\Z')
+    # String literals of the text, for the strings-only reassembling. The simple ones are decoded without json.
+    _literal_re = re.compile(r'("(?:[^"\\\n]|\\.)*")')
+    _simple_literal_re = re.compile(r'"[^"\\\x00-\x1f]*"\Z')
+
+    def __init__(self, bin_file: str = None, txt_file: str = None, bin_encoding: str = "cp932",
+                 txt_encoding: str = "cp932", version: str = None, debug: bool = False) -> None:
         """Initialize ACPXBin class.
+        bin_file -- name of the bin script (not needed for the in-memory interface).
+        txt_file -- name of the txt file (not needed for the in-memory interface).
         bin_encoding -- encoding of the script.
         txt_encoding -- encoding of the txt file.
         version -- the script version."""
@@ -47,24 +147,78 @@ class ACPXBinScript:
 
     # Interface.
 
-    def assemble(self):
-        """Assemble the script."""
+    def assemble(self, ir_cache=False):
+        """Assemble the script.
+        ir_cache -- use the sidecar of the text (see "ir_cache_file") instead of parsing if the text is the same
+        and reuse the code block of the old script if only the strings were changed."""
         if self._debug:
             print("=== Assembling of {} from {} started.".format(self.bin_file, self.txt_file))
 
-        # First, we should get all the strings. Without that, we cannot calculate the offsets.
+        if ir_cache:
+            bin_data, data_001 = self._assemble_cached()
+        else:
+            with open(self.txt_file, 'r', encoding=self.txt_encoding, errors='replace') as df:
+                bin_data, data_001 = self.assemble_data(df)
+        self.save_data(bin_data, data_001)
+
+        if self._debug:
+            print("=== Assembling of {} from {} ended.".format(self.bin_file, self.txt_file))
+
+    def assemble_data(self, text) -> tuple:
+        """Assemble the script in memory.
+        text -- disassembled script: str or text stream (StringIO, opened file...).
+        Returns...
+        (bin script data, 001's file data or None if there is no such file)"""
+
+        # First, we should parse the text once and get all the strings. Without that, we cannot calculate the offsets.
+
+        if isinstance(text, str):
+            text = io.StringIO(text)
+        return self._assemble_ir(self._compile_text(text))
 
-        strings, offsets, labels, string_block_len_pointer = self._get_pre_data()
+    def assemble_text(self, text: str, build: tuple = None) -> tuple:
+        """Assemble the script in memory, reusing the code block of the previous assembling of the same script
+        if only the strings were changed. Then the text is not parsed, only its string literals are read.
+        text -- disassembled script.
+        build -- build of the previous assembling (as it is returned) or None.
+        Returns...
+        (bin script data, 001's file data or None if there is no such file, build of this assembling)"""
+        text = self._normalize_newlines(text)
+        parts = self._literal_re.split(text)
+        if build is not None:
+            skeleton, literals, code = build
+            result = self._reassemble_strings(parts, skeleton, literals, lambda string_number: code)
+            if result is not None:
+                return (*result, build)
+
+        ir = self._compile_text(io.StringIO(text))
+        bin_data, data_001 = self._assemble_ir(ir)
+        skeleton, literals = self._get_skeleton(ir, parts)
+        code_block_start = self._get_code_block_start(len(ir[1]))
+        return bin_data, data_001, (skeleton, literals, bin_data[code_block_start:code_block_start + ir[4]])
+
+    def _compile_text(self, df) -> tuple:
+        """Parse the disassembled text and get the data for the assembling.
+        df -- disassembled text stream.
+        Returns...
+        (list of ACPXInstruction, strings, offsets, offsets' labels, the code length)"""
+        instructions, label_positions = self._parse_text(df)
+        return (instructions, *self._get_pre_data(instructions, label_positions))
+
+    def _assemble_ir(self, ir: tuple, code: bytes = None) -> tuple:
+        """Assemble the script from the parsed text.
+        ir -- parsed text, see _compile_text.
+        code -- ready code block or None to assemble it.
+        Returns...
+        (bin script data, 001's file data or None if there is no such file)"""
+        instructions, strings, offsets, labels, string_block_len_pointer = ir
         if self._debug:
             print("= Strings.")
             print(*strings, sep='\n')
 
         # Next, we should calculate the start of the code block and fix the offsets.
 
-        if self._version == "ESCR_NEW":
-            code_block_start = 24
-        else:
-            code_block_start = 8 + 4 + 4 * len(strings) + 4
+        code_block_start = self._get_code_block_start(len(strings))
         offsets = [code_block_start + i for i in offsets]
         self.command_lib.offset_bank = tuple(offsets)
         self.command_lib.label_definer = tuple(labels)
@@ -80,143 +234,334 @@ class ACPXBinScript:
         # # Assemble the header, assemble the code, assemble the strings and rewrite the strings offset
         # # and the length of the strings block.
 
-        self._assemble(strings, string_block_len_pointer)
-
-        if self._debug:
-            print("=== Assembling of {} from {} ended.".format(self.bin_file, self.txt_file))
+        return self._assemble(instructions, strings, string_block_len_pointer, code)
 
-    def disassemble(self, version_autochange=True, string_autochange=True, offsets_autochange=True):
+    def disassemble(self, version_autochange=True, string_autochange=True, offsets_autochange=True,
+                    single_pass=True, cache=None):
         """Disassemble the script.
         version_autochange -- get version from the script.
         string_autochange -- get strings from the script.
-        offsets_autochange -- automatically change the start code block offsets."""
+        offsets_autochange -- automatically change the start code block offsets.
+        single_pass -- decode the code once, collecting offsets on the way, instead of the offsets pre-scan.
+        cache -- ACPXDisassemblyCache to take the text from or to put it in or None."""
 
         if self._debug:
             print("=== Disassembling of {} to {} started.".format(self.bin_file, self.txt_file))
 
-        version, string_offsets, code_block_offset, string_block_offset = self._unpack_header()
+        bin_data, data_001 = self.load_data()
+        key = None
+        if cache is not None:
+            key = cache.get_key(bin_data, data_001, (self._version, self.bin_encoding, self.txt_encoding, self._debug,
+                                                     version_autochange, string_autochange, offsets_autochange))
+            if cache.load(key, self.txt_file):
+                if version_autochange:
+                    self.version = self._unpack_header(bin_data, data_001)[0]
+                if self._debug:
+                    print("= Text is taken from the cache.")
+                    print("=== Disassembling of {} to {} ended.".format(self.bin_file, self.txt_file))
+                return
+
+        self._disassemble(bin_data, data_001, lambda: open(self.txt_file, 'w', encoding=self.txt_encoding),
+                          version_autochange, string_autochange, offsets_autochange, single_pass)
+        if key is not None:
+            cache.store(key, self.txt_file)
+
         if self._debug:
-            print("= Header disassembled.")
-            print("Version:", version)
-            print("String number:", len(string_offsets))
-            print("String offsets:", string_offsets)
-            print("String block offset:", string_block_offset)
-            print("Code block offset:", code_block_offset)
+            print("=== Disassembling of {} to {} ended.".format(self.bin_file, self.txt_file))
+
+    def disassemble_data(self, bin_data, data_001=None, version_autochange=True, string_autochange=True,
+                         offsets_autochange=True, single_pass=True) -> str:
+        """Disassemble the script in memory and get the text.
+        bin_data -- data of the bin script: bytes-like object or binary stream (BytesIO, opened file...).
+        data_001 -- data of 001's file as bin_data or None if there is no such file.
+        For other arguments see "disassemble"."""
+        bin_data = self._get_data(bin_data)
+        data_001 = self._get_data(data_001)
+        df = io.StringIO()
+        self._disassemble(bin_data, data_001, lambda: contextlib.nullcontext(df),
+                          version_autochange, string_autochange, offsets_autochange, single_pass)
+        return df.getvalue()
+
+    def export_strings(self, version_autochange=True) -> list:
+        """Get the strings of the script without disassembling.
+        version_autochange -- get version from the script.
+        Returns...
+        list of (index, offset in the string section, string)"""
+        bin_data, data_001 = self.load_data()
+        version, string_offsets, code_block_offset, string_block_offset = self._unpack_header(bin_data, data_001)
         if version_autochange:
             self.version = version
+        strings = self._unpack_strings(bin_data, data_001, string_block_offset, string_offsets)
+        return list(zip(range(len(strings)), string_offsets, strings))
+
+    def import_strings(self, strings: list) -> None:
+        """Replace the strings of the script without assembling, the code is copied as it is.
+        strings -- all the strings of the script, as they are got by export_strings."""
+        self.save_data(*self.import_strings_data(strings))
+
+    def import_strings_data(self, strings: list) -> tuple:
+        """Replace the strings of the script in memory, the script files are only read.
+        strings -- all the strings of the script, as they are got by export_strings.
+        Returns...
+        (bin script data, 001's file data or None if there is no such file)"""
+        bin_data, data_001 = self.load_data()
+        version, string_offsets, code_block_offset, string_block_offset = self._unpack_header(bin_data, data_001)
+        self.version = version
+        if len(strings) != len(string_offsets):
+            raise ValueError("Incorrect number of strings: {} instead of {}!".format(len(strings),
+                                                                                  len(string_offsets)))
 
+        if self._version == "ESCR_NEW":
+            code = bin_data[code_block_offset:self._get_code_end(bin_data, 0)]
+        else:
+            code = bin_data[code_block_offset:string_block_offset]
+            strings = [self.restring(i, 'external', 'internal') for i in strings]
+        return self._assemble([], strings, len(code), code)
+
+    def iter_instructions(self, bin_data=None, data_001=None, version_autochange=True):
+        """Decode the script lazily, instruction by instruction, without the text.
+        Yields ACPXDecodedInstruction for every command and every run of free bytes.
+        bin_data -- data of the bin script (see "disassemble_data") or None to read the script files.
+        data_001 -- data of 001's file or None.
+        version_autochange -- get version from the script."""
+        if bin_data is None:
+            bin_data, data_001 = self.load_data()
+        else:
+            bin_data = self._get_data(bin_data)
+            data_001 = self._get_data(data_001)
+
+        version, string_offsets, code_block_offset, string_block_offset = self._unpack_header(bin_data, data_001)
+        if version_autochange:
+            self.version = version
         if self._version == "ESCR_NEW":
             end_offset = 0
         else:
             end_offset = string_block_offset
 
-        if offsets_autochange:
-            self.command_lib.offset_beginner = code_block_offset
-            offsets = self._extract_offsets(code_block_offset, end_offset)
-            self.command_lib.offset_bank = sorted(set(offsets))
-            self.command_lib.label_definer = tuple(range(len(offsets)))
-        if self._debug:
-            print("Offsets:", self.command_lib.offset_bank)
-            print("Offsets number:", len(self.command_lib.offset_bank))
-
-        strings = self._unpack_strings(string_block_offset, string_offsets)
-        if self._debug:
-            print("= Strings unpacked.")
-            print(*strings, sep='\n')
-        if string_autochange:
-            self.command_lib.string_bank = strings
-
-        self._disassemble_code(code_block_offset, end_offset)
+        # Only the offsets are kept, the code is decoded second time while yielding.
+        self.command_lib.offset_beginner = code_block_offset
+        offsets = self._extract_offsets(bin_data, code_block_offset, end_offset)
+        self.command_lib.offset_bank = sorted(set(offsets))
+        self.command_lib.label_definer = tuple(range(len(offsets)))
+        self.command_lib.string_bank = self._unpack_strings(bin_data, data_001, string_block_offset,
+                                                            string_offsets)
+
+        resolve_args = self.command_lib.resolve_args
+        labels = dict(self.command_lib.get_sorted_labels())
+        for pointer, command, arguments in self._decode_code(bin_data, code_block_offset, end_offset):
+            if command is None:
+                yield ACPXDecodedInstruction(pointer, None, None, arguments, labels.get(pointer))
+            else:
+                yield ACPXDecodedInstruction(
+                    pointer, command.opcode, self.command_lib.get_true_name(command.index),
+                    resolve_args(list(arguments), command.string_fields, command.label_fields),
+                    labels.get(pointer))
 
-        if self._debug:
-            print("=== Disassembling of {} to {} ended.".format(self.bin_file, self.txt_file))
+    def load_data(self) -> tuple:
+        """Read the script files at once, for the data interface (disassemble_data...).
+        Returns...
+        (bin script data, 001's file data or None if there is no such file)"""
+        with open(self.bin_file, 'rb') as sf:
+            bin_data = sf.read()
+        data_001 = None
+        if self.version == "ESCR_NEW":
+            try:
+                with open(self.file_001, 'rb') as sf:
+                    data_001 = sf.read()
+            except FileNotFoundError:  # 0 strings case.
+                pass
+        return bin_data, data_001
+
+    def save_data(self, bin_data: bytes, data_001: bytes) -> None:
+        """Write the script files, for the data interface (assemble_data, assemble_text...).
+        bin_data -- data of the bin script.
+        data_001 -- data of 001's file or None if there is no such file."""
+        if data_001 is not None:
+            with open(self.file_001, 'wb') as strf:  # The second file, the message one.
+                strf.write(data_001)
+        with open(self.bin_file, 'wb') as af:
+            af.write(bin_data)
 
     # Technical methods.
 
     # # For assembling.
 
-    def _get_pre_data(self) -> tuple:
-        """Get data for the future assembling: strings, offsets and offsets' labels."""
+    def _parse_text(self, df) -> tuple:
+        """Parse the disassembled text.
+        df -- disassembled file.
+        Returns...
+        (list of ACPXInstruction, list of (number of the instruction after the label, label))"""
+        instructions = []
+        label_positions = []
+        commands_by_name = self.command_lib.commands_by_name
+        line_match = self._line_re.match
+        parse_args = self._parse_args
+
+        lines = enumerate(df, 1)
+        for line_number, new_line in lines:
+            new_line = new_line.rstrip()
+            if new_line == '':  # Empty lines are skipped.
+                continue
+            usual = line_match(new_line)
+            if usual is not None:  # Fast path.
+                free_bytes, command_name = usual.groups()
+                if free_bytes is not None:
+                    instructions.append(ACPXInstruction(None, bytes.fromhex(free_bytes), line_number))
+                else:
+                    command = commands_by_name.get(command_name)
+                    if command is None:
+                        raise TypeError("Incorrect opcode {} at line {}!".format(command_name, line_number))
+                    instructions.append(ACPXInstruction(command, *parse_args(lines, line_number)))
+            elif new_line[0] == '*':  # Label.
+                label_positions.append((len(instructions), new_line[1:]))
+            elif new_line[0] == '#':  # Command.
+                if len(new_line) == 1:  # Some extra checks.
+                    continue
+                if new_line[1] == '0':
+                    free_bytes = new_line.split('>')[1]
+                    free_bytes = [i for i in free_bytes.split(' ') if (len(i) == 2) and (i[0] != '<')]
+                    try:
+                        free_bytes = bytes.fromhex(" ".join(free_bytes))
+                    except ValueError as ex:
+                        raise ValueError("Incorrect free bytes at line {}: {}".format(line_number, ex)) from None
+                    instructions.append(ACPXInstruction(None, free_bytes, line_number))
+                elif new_line[1] == '1':
+                    command_name = new_line.split('>')[1]
+                    command_name = command_name.split(' ')[0]  # In case of debug mode was enabled.
+                    command = commands_by_name.get(command_name)
+                    if command is None:
+                        raise TypeError("Incorrect opcode {} at line {}!".format(command_name, line_number))
+                    arg_data, args_line_number = parse_args(lines, line_number)
+                    instructions.append(ACPXInstruction(command, arg_data, args_line_number))
+            elif new_line[0] == '@':  # To be safe.
+                continue
+
+        return instructions, label_positions
+
+    @classmethod
+    def _parse_args(cls, lines, line_number: int) -> list:
+        """Parse arguments of the command, skipping comments and empty lines.
+        lines -- iterator of (line number, line) of the disassembled file.
+        line_number -- number of the command's line.
+        Returns...
+        (list of arguments, number of the arguments' line)"""
+        for args_line_number, arg_line in lines:
+            if (arg_line[0] != '@') and arg_line.strip():
+                try:
+                    return cls.parse_args_line(arg_line), args_line_number
+                except ValueError as ex:
+                    raise ValueError("Incorrect arguments at line {}: {}".format(args_line_number, ex)) from None
+        raise ValueError("No arguments for the command at line {}!".format(line_number))
+
+    @classmethod
+    def parse_args_line(cls, arg_line: str) -> list:
+        """Parse the line of arguments, the usual ones without json.
+        arg_line -- line of arguments."""
+        usual = cls._args_re.match(arg_line)
+        if usual is None:
+            return json.loads(arg_line)
+        string, string_number, numbers = usual.groups()
+        if string is not None:
+            if string_number is None:
+                return [string]
+            return [string, int(string_number)]
+        if numbers is not None:
+            return [int(i) for i in numbers.split(', ')]
+        return []
+
+    def _get_pre_data(self, instructions: list, label_positions: list) -> tuple:
+        """Get data for the future assembling: strings, offsets, offsets' labels and the code length.
+        instructions -- parsed instructions.
+        label_positions -- parsed labels."""
         if self._version == "ESCR_NEW":
             strings = []
         else:
             strings = ['']
         offsets = []
         labels = []
-
-        with open(self.txt_file, 'r', encoding=self.txt_encoding, errors='replace') as df:
-            pointer = 0
-            while True:
-                new_line = df.readline()
-                if new_line == '':
-                    break
-                new_line = new_line.rstrip()
-                if new_line[0] == '*':  # Label.
-                    offsets.append(pointer)
-                    labels.append(new_line[1:])
-                elif new_line[0] == '#':  # Command.
-                    if len(new_line) == 1:  # Some extra checks.
-                        continue
-                    if new_line[1] == '0':
-                        free_bytes = new_line.split('>')[1]
-                        free_bytes = [i for i in free_bytes.split(' ') if (len(i) == 2) and (i[0] != '<')]
-                        pointer += len(free_bytes)
-                    elif new_line[1] == '1':
-                        pointer += 1  # For the opcode.
-                        command = new_line.split('>')[1]
-                        command = command.split(' ')[0]  # In case of debug mode was enabled.
-                        index = self.command_lib.get_command_index(command)
-                        if index == -1:
-                            raise TypeError("Incorrect opcode {}!".format(command))
-                        arguments = self.command_lib.command_library[index][1]
-                        pointer += self.command_lib.get_len_from_structure(arguments)
-                        arg_data = json.loads(df.readline())
-                        new_strings = self.command_lib.get_all_linked_strings(arguments, arg_data)
-                        if self._version != "ESCR_NEW":
-                            for i in range(len(new_strings)):
-                                new_strings[i] = self.restring(new_strings[i], 'external', 'internal')
-                        strings.extend(new_strings)
-                elif new_line[0] == '@':  # To be safe.
-                    continue
+        label_positions = label_positions + [(len(instructions) + 1, None)]  # Sentinel.
+        label_cursor = 0
+
+        pointer = 0
+        for number, instruction in enumerate(instructions):
+            while label_positions[label_cursor][0] == number:
+                offsets.append(pointer)
+                labels.append(label_positions[label_cursor][1])
+                label_cursor += 1
+            command = instruction.command
+            if command is None:
+                pointer += len(instruction.arguments)
+                continue
+            pointer += 1 + command.args_len  # For the opcode and the arguments.
+            try:
+                new_strings = [instruction.arguments[command.arg_fields[field]] for field in command.string_fields]
+            except IndexError:
+                raise ValueError("Not enough arguments at line {}!".format(instruction.line)) from None
+            for string in new_strings:
+                if not isinstance(string, str):
+                    raise ValueError("Incorrect arguments at line {}: {} is not a string!".format(
+                        instruction.line, string))
+            if self._version != "ESCR_NEW":
+                new_strings = [self.restring(i, 'external', 'internal') for i in new_strings]
+            strings.extend(new_strings)
+        for _, label in label_positions[label_cursor:-1]:  # Labels at the end of the code.
+            offsets.append(pointer)
+            labels.append(label)
 
         return strings, offsets, labels, pointer
 
-    def _assemble(self, strings: list, string_block_len_pointer: int) -> None:
+    def _assemble(self, instructions: list, strings: list, string_block_len_pointer: int,
+                  code: bytes = None) -> tuple:
         """Assemble the script.
+        instructions -- parsed instructions.
         strings -- the script's strings.
-        string_block_len_pointer -- pointer to the end of the strings block."""
-        with (open(self.bin_file, 'wb') as af,
-              open(self.txt_file, 'r', encoding=self.txt_encoding, errors='replace') as df):
-            # tech_strings = [i.encode(self.bin_encoding) + b'\x00' for i in strings]
-            tech_strings = [self.command_lib.set_S(i, self.bin_encoding) for i in strings]
-            str_block_len = self._assemble_header(af, tech_strings, string_block_len_pointer)
-            self._assemble_code(af, df)
-            if self._version != "ESCR_NEW":
-                self._assemble_strings(af, tech_strings, str_block_len)
-
-    def _assemble_header(self, af, bstrings, string_block_len_pointer) -> int:
+        string_block_len_pointer -- pointer to the end of the strings block.
+        code -- ready code block or None to assemble it.
+        Returns...
+        (bin script data, 001's file data or None if there is no such file)"""
+        af = io.BytesIO()
+        strf = io.BytesIO()  # The second file, the message one.
+        # Strings are encoded separately for their offsets, but obfuscated all at once.
+        tech_strings = [self.command_lib.set_plain_S(i, self.bin_encoding) for i in strings]
+        strings_block = self.command_lib.encode_strings_block(b''.join(tech_strings))
+        str_block_len = self._assemble_header(af, strf, tech_strings, strings_block, string_block_len_pointer)
+        if code is None:
+            code = bytearray(string_block_len_pointer)  # Code block length is already known.
+            self._assemble_code(code, instructions)
+        elif self._debug:
+            print("= Code block is reused.")
+        af.write(code)
+        if self._version != "ESCR_NEW":
+            self._assemble_strings(af, strings_block, str_block_len)
+
+        data_001 = None
+        if self._version == "ESCR_NEW" and tech_strings:  # No 001's file when 0 strings.
+            data_001 = strf.getvalue()
+        return af.getvalue(), data_001
+
+    def _assemble_header(self, af, strf, bstrings, strings_block, string_block_len_pointer) -> int:
         """Assemble the header and get len of string block.
         af -- assembly file.
+        strf -- 001's file.
         bstrings -- byte strings.
+        strings_block -- strings block as it is stored in the script.
         string_block_len_pointer -- pointer to the end of the strings block."""
 
         if self._version == "ESCR_NEW":
             if bstrings:  # No assemble when 0 strings.
-                with open(self.file_001, 'wb') as strf:  # The second file, the message one.
-                    strf.write(b'@mess:__')
-                    strf.write(struct.pack('I', len(bstrings)))
-
-                    lenner = 0
-                    for bstr in bstrings:
-                        lenner += len(bstr)
-
-                    strf.write(struct.pack('I', lenner))
-                    pointer = 0
-                    for bstr in bstrings:
-                        strf.write(struct.pack('I', pointer))
-                        pointer += len(bstr)
-                    for bstr in bstrings:
-                        strf.write(bstr)
+                strf.write(b'@mess:__')
+                strf.write(struct.pack('I', len(bstrings)))
+
+                lenner = 0
+                for bstr in bstrings:
+                    lenner += len(bstr)
+
+                strf.write(struct.pack('I', lenner))
+                pointer = 0
+                for bstr in bstrings:
+                    strf.write(struct.pack('I', pointer))
+                    pointer += len(bstr)
+                strf.write(strings_block)
             else:
                 pointer = 0
 
@@ -238,54 +583,299 @@ class ACPXBinScript:
 
         return pointer
 
-    def _assemble_code(self, af, df, new_scr_supp_len=0) -> None:
+    def _assemble_code(self, code: bytearray, instructions: list) -> int:
         """Assemble the code and return its end.
-        af -- assembly file.
-        df -- disassembled file."""
-
-        while True:
-            new_line = df.readline()
-            if new_line == '':
-                break
-            new_line = new_line.rstrip()
-            if new_line[0] == '#':  # Command.
-                if len(new_line) == 1:  # Some extra checks.
-                    continue
-                if new_line[1] == '0':
-                    free_bytes = new_line.split('>')[1]
-                    free_bytes = [i for i in free_bytes.split(' ') if (len(i) == 2) and (i[0] != '<')]
-                    free_bytes = " ".join(free_bytes)
-                    af.write(bytes.fromhex(free_bytes))
-                elif new_line[1] == '1':
-                    command = new_line.split('>')[1]
-                    command = command.split(' ')[0]  # In case of debug mode was enabled.
-                    index = self.command_lib.get_command_index(command)
-                    if index == -1:
-                        raise TypeError("Incorrect opcode {}!".format(command))
-                    command_byte = bytes.fromhex(self.command_lib.command_library[index][0])
-                    af.write(command_byte)
-
-                    arguments = self.command_lib.command_library[index][1]
-                    arg_data = self.read_args(df)
-                    arg_bytes = self.command_lib.set_args(arg_data, arguments)
-                    af.write(arg_bytes)
-            elif new_line[0] == '@':  # Just to be safe.
+        code -- preallocated buffer of the code block.
+        instructions -- parsed instructions."""
+
+        pointer = 0
+        set_command = self.command_lib.set_command
+        for instruction in instructions:
+            command = instruction.command
+            if command is None:  # Free bytes.
+                free_bytes = instruction.arguments
+                code[pointer:pointer + len(free_bytes)] = free_bytes
+                pointer += len(free_bytes)
                 continue
+            try:
+                pointer = set_command(code, pointer, command, instruction.arguments)
+            except (struct.error, IndexError, TypeError, ValueError) as ex:
+                raise ValueError("Incorrect arguments at line {}: {}".format(instruction.line, ex)) from None
+        return pointer
 
-    def _assemble_strings(self, af, bstrings: list, str_block_len: int) -> None:
+    def _assemble_strings(self, af, strings_block: bytes, str_block_len: int) -> None:
         """Assemble strings.
         af -- assembly file.
-        bstrings -- byte strings.
+        strings_block -- strings block as it is stored in the script.
         str_block_len -- length of the string block."""
 
         af.write(struct.pack('I', str_block_len))
-        for bstr in bstrings:
-            af.write(bstr)
+        af.write(strings_block)
+
+    # # For the sidecar and the strings-only reassembling.
+    # Skeleton of the text is the text without the string arguments: split by the string literals, the string
+    # arguments are blanked. The same skeleton -- the same code block, so only the strings are to be written.
+
+    def _assemble_cached(self) -> tuple:
+        """Assemble the script with the sidecar.
+        The code block is taken from the old script if only the strings were changed (or nothing at all),
+        that is the skeleton of the text is the same and the old code block is not touched.
+        Else the parsed text is taken from the sidecar if the text is the same.
+        Returns...
+        (bin script data, 001's file data or None if there is no such file)"""
+        with open(self.txt_file, 'rb') as df:
+            text = df.read()
+            stat = os.fstat(df.fileno())
+        key = (self.ir_cache_format, stat.st_size, stat.st_mtime_ns, hashlib.sha1(text).digest(),
+               self._version, self.txt_encoding)
+
+        build, same_text = self._load_ir_cache(key)
+        text = self._normalize_newlines(text.decode(self.txt_encoding, errors='replace'))
+        parts = self._literal_re.split(text)
+        if build is not None:
+            skeleton, literals, code_length, code_digest = build
+            result = self._reassemble_strings(
+                parts, skeleton, literals,
+                lambda string_number: self._get_old_code(string_number, code_length, code_digest))
+            if result is not None:
+                return result
+
+        if same_text:  # The old script is gone, but the text is parsed already.
+            ir = self._load_ir()
+            if ir is not None:
+                return self._assemble_ir(ir)
+
+        ir = self._compile_text(io.StringIO(text))
+        bin_data, data_001 = self._assemble_ir(ir)
+        skeleton, literals = self._get_skeleton(ir, parts)
+        code_block_start = self._get_code_block_start(len(ir[1]))
+        code_digest = hashlib.sha1(bin_data[code_block_start:code_block_start + ir[4]]).digest()
+        self._save_ir_cache(key, (skeleton, literals, ir[4], code_digest), ir)
+        return bin_data, data_001
+
+    def _reassemble_strings(self, parts: list, skeleton: bytes, literals: tuple, get_code):
+        """Assemble the script with the old code block, if only the strings were changed.
+        parts -- text split by the string literals.
+        skeleton -- digest of the skeleton of the old text or None.
+        literals -- numbers of the string literals of the old text, which are the script's strings, or None.
+        get_code -- function (number of the strings) to get the old code block or None if it is gone.
+        Returns...
+        (bin script data, 001's file data or None if there is no such file) or None"""
+        if (skeleton is None) or (self._get_skeleton_digest(parts, literals) != skeleton):
+            return None
+        try:
+            strings = [self._decode_literal(parts[2 * i + 1]) for i in literals]
+        except ValueError:  # Let the parser tell about it.
+            return None
+        if self._version != "ESCR_NEW":
+            strings = [''] + [self.restring(i, 'external', 'internal') for i in strings]
+        code = get_code(len(strings))
+        if code is None:
+            return None
+        if self._debug:
+            print("= Only the strings were changed.")
+        return self._assemble([], strings, len(code), code)
+
+    def _get_skeleton(self, ir: tuple, parts: list) -> tuple:
+        """Get (digest of the skeleton, numbers of the string literals, which are the script's strings)
+        or (None, None) if the literals cannot be matched with the strings.
+        ir -- parsed text, see _compile_text.
+        parts -- the text split by the string literals."""
+        literal_lines = {}  # Line number -> numbers of the literals on it.
+        line_number = 1
+        for i in range(len(parts) // 2):
+            line_number += parts[2 * i].count('\n')
+            literal_lines.setdefault(line_number, []).append(i)
+
+        literals = []
+        try:
+            for instruction in ir[0]:
+                command = instruction.command
+                if (command is None) or (not command.string_fields):
+                    continue
+                arguments = instruction.arguments
+                string_arguments = [i for i, argument in enumerate(arguments) if isinstance(argument, str)]
+                line_literals = literal_lines.get(instruction.line, ())
+                if len(line_literals) != len(string_arguments):
+                    return None, None
+                for field in command.string_fields:
+                    argument = command.arg_fields[field]
+                    literal = line_literals[string_arguments.index(argument)]
+                    if self._decode_literal(parts[2 * literal + 1]) != arguments[argument]:
+                        return None, None
+                    literals.append(literal)
+        except ValueError:
+            return None, None
+        literals = tuple(literals)
+        return self._get_skeleton_digest(parts, literals), literals
+
+    def _get_skeleton_digest(self, parts: list, literals: tuple) -> bytes:
+        """Get digest of the skeleton: the text split by the string literals with the script's strings blanked.
+        parts -- the text split by the string literals.
+        literals -- numbers of the string literals, which are the script's strings."""
+        skeleton = list(parts)
+        for i in literals:
+            skeleton[2 * i + 1] = None
+        return hashlib.sha1(marshal.dumps((self._version, skeleton))).digest()
+
+    @classmethod
+    def _decode_literal(cls, literal: str) -> str:
+        """Decode the string literal of the text."""
+        if cls._simple_literal_re.match(literal) is not None:
+            return literal[1:-1]
+        return json.loads(literal)
+
+    @staticmethod
+    def _normalize_newlines(text: str) -> str:
+        """Translate newlines as the text mode does."""
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    def _get_old_code(self, string_number: int, code_length: int, code_digest: bytes):
+        """Get the code block of the old script or None if it is absent or changed.
+        string_number -- number of the strings of the script.
+        code_length -- length of the code block as it was assembled.
+        code_digest -- digest of the code block as it was assembled."""
+        try:
+            with open(self.bin_file, 'rb') as af:
+                bin_data = af.read()
+        except OSError:
+            return None
+        code_block_start = self._get_code_block_start(string_number)
+        code = bin_data[code_block_start:code_block_start + code_length]
+        if (len(code) != code_length) or (hashlib.sha1(code).digest() != code_digest):
+            return None
+        return code
+
+    def _load_ir_cache(self, key: tuple) -> tuple:
+        """Load the head of the sidecar.
+        key -- key of the text.
+        Returns...
+        ((skeleton digest, string literals, code block length, code block digest) of the last assembling or None,
+        is the text the same)"""
+        try:
+            with open(self.ir_cache_file, 'rb') as cf:
+                head_length, head_digest, body_length, body_digest = self._read_ir_cache_header(cf)
+                head = cf.read(head_length)  # Small head, the parsed text is loaded only if needed.
+            if hashlib.sha1(head).digest() != head_digest:
+                return None, False
+            cache_key, build = marshal.loads(head)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None, False
+        if (cache_key[0] != self.ir_cache_format) or (cache_key[4:] != key[4:]):
+            return None, False
+        return build, cache_key == key
+
+    def _load_ir(self):
+        """Load the parsed text from the sidecar or get None."""
+        try:
+            with open(self.ir_cache_file, 'rb') as cf:
+                head_length, head_digest, body_length, body_digest = self._read_ir_cache_header(cf)
+                cf.seek(head_length, os.SEEK_CUR)
+                body = cf.read()
+            if (len(body) != body_length) or (hashlib.sha1(body).digest() != body_digest):
+                return None
+            commands, arguments, lines, *pre_data = marshal.loads(body)  # Faster than marshal.load.
+            library = self.command_lib.commands
+            commands = [None if index == -1 else library[index] for index in commands]
+            instructions = list(map(ACPXInstruction, commands, arguments, lines))
+        except (OSError, EOFError, ValueError, TypeError, IndexError):
+            return None
+        return (instructions, *pre_data)
+
+    def _save_ir_cache(self, key: tuple, build: tuple, ir: tuple) -> None:
+        """Save the sidecar. It is written to the temporary file first, so the broken sidecar is never seen.
+        key -- key of the text.
+        build -- (skeleton digest, string literals, code block length, code block digest) of the assembling.
+        ir -- parsed text, see _compile_text."""
+        instructions, *pre_data = ir
+        commands = [-1 if i.command is None else i.command.index for i in instructions]
+        arguments = [i.arguments for i in instructions]
+        lines = [i.line for i in instructions]
+        head = marshal.dumps((key, build))
+        body = marshal.dumps((commands, arguments, lines, *pre_data))
+        temp_file = "{}.{}.{}.tmp".format(self.ir_cache_file, os.getpid(), threading.get_ident())
+        try:
+            with open(temp_file, 'wb') as cf:
+                cf.write(self._ir_cache_header.pack(self._ir_cache_magic, self.ir_cache_format,
+                                                    len(head), hashlib.sha1(head).digest(),
+                                                    len(body), hashlib.sha1(body).digest()))
+                cf.write(head)
+                cf.write(body)
+            os.replace(temp_file, self.ir_cache_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def _read_ir_cache_header(self, cf) -> tuple:
+        """Read the header of the sidecar.
+        cf -- sidecar file.
+        Returns...
+        (length of the head, digest of the head, length of the parsed text, digest of the parsed text)"""
+        header = cf.read(self._ir_cache_header.size)
+        if len(header) != self._ir_cache_header.size:
+            raise EOFError("Sidecar is cut!")
+        magic, cache_format, *lengths_and_digests = self._ir_cache_header.unpack(header)
+        if (magic != self._ir_cache_magic) or (cache_format != self.ir_cache_format):
+            raise ValueError("Not a sidecar of this format!")
+        return tuple(lengths_and_digests)
 
     # # For disassembling.
 
-    def _unpack_header(self) -> tuple:
+    def _disassemble(self, bin_data: bytes, data_001: bytes, open_output, version_autochange: bool,
+                     string_autochange: bool, offsets_autochange: bool, single_pass: bool) -> None:
+        """Disassemble the script.
+        bin_data -- data of the bin script.
+        data_001 -- data of 001's file or None.
+        open_output -- function to get the context manager of the output text stream.
+        For other arguments see "disassemble"."""
+        version, string_offsets, code_block_offset, string_block_offset = self._unpack_header(bin_data, data_001)
+        if self._debug:
+            print("= Header disassembled.")
+            print("Version:", version)
+            print("String number:", len(string_offsets))
+            print("String offsets:", string_offsets)
+            print("String block offset:", string_block_offset)
+            print("Code block offset:", code_block_offset)
+        if version_autochange:
+            self.version = version
+
+        if self._version == "ESCR_NEW":
+            end_offset = 0
+        else:
+            end_offset = string_block_offset
+
+        instructions = None
+        if offsets_autochange:
+            self.command_lib.offset_beginner = code_block_offset
+            if single_pass:
+                instructions = list(self._decode_code(bin_data, code_block_offset, end_offset))
+                offsets = self._get_instructions_offsets(instructions)
+            else:
+                offsets = self._extract_offsets(bin_data, code_block_offset, end_offset)
+            self.command_lib.offset_bank = sorted(set(offsets))
+            self.command_lib.label_definer = tuple(range(len(offsets)))
+        if self._debug:
+            print("Offsets:", self.command_lib.offset_bank)
+            print("Offsets number:", len(self.command_lib.offset_bank))
+
+        strings = self._unpack_strings(bin_data, data_001, string_block_offset, string_offsets)
+        if self._debug:
+            print("= Strings unpacked.")
+            print(*strings, sep='\n')
+        if string_autochange:
+            self.command_lib.string_bank = strings
+
+        if instructions is None:  # Decode while writing.
+            instructions = self._decode_code(bin_data, code_block_offset, end_offset)
+        with open_output() as df:
+            self._disassemble_code(df, instructions, code_block_offset)
+
+    def _unpack_header(self, bin_data: bytes, data_001: bytes) -> tuple:
         """Unpack bin script header.
+        bin_data -- data of the bin script.
+        data_001 -- data of 001's file or None.
         Returns...
         (version, string offsets, code_block_offset, string_block_offset)"""
         version = ""
@@ -297,140 +887,161 @@ class ACPXBinScript:
             code_block_offset = 24
             version = "ESCR_NEW"
 
-            try:
-                with open(self.file_001, 'rb') as sf:
-                    sf.seek(8, 0)
-                    off_num = struct.unpack('I', sf.read(4))[0]
-                    test_num = struct.unpack('I', sf.read(4))[0]  # From strings start to their end. Check num.
-                    for _ in range(off_num):
-                        string_offsets.append(struct.unpack('I', sf.read(4))[0])
-                    string_block_offset = sf.tell()
-            except FileNotFoundError:  # 0 strings case.
-                pass
+            if data_001 is not None:  # Else 0 strings case.
+                off_num = struct.unpack_from('I', data_001, 8)[0]
+                test_num = struct.unpack_from('I', data_001, 12)[0]  # From strings start to their end. Check num.
+                string_offsets = list(struct.unpack_from('{}I'.format(off_num), data_001, 16))
+                string_block_offset = 16 + 4 * off_num
 
         else:
-            with open(self.bin_file, 'rb') as sf:
-                version = sf.read(8).decode('cp932')  # Signature. Do not change this line!!!
-                off_num = struct.unpack('I', sf.read(4))[0]
-                for _ in range(off_num):
-                    string_offsets.append(struct.unpack('I', sf.read(4))[0])
-                string_block_offset = struct.unpack('I', sf.read(4))[0]
-                code_block_offset = sf.tell()
-                string_block_offset += code_block_offset  # As the offset from the beginning of the code block.
+            version = bin_data[:8].decode('cp932')  # Signature. Do not change this line!!!
+            off_num = struct.unpack_from('I', bin_data, 8)[0]
+            string_offsets = list(struct.unpack_from('{}I'.format(off_num), bin_data, 12))
+            code_block_offset = 12 + 4 * off_num
+            string_block_offset = struct.unpack_from('I', bin_data, code_block_offset)[0]
+            code_block_offset += 4
+            string_block_offset += code_block_offset  # As the offset from the beginning of the code block.
         return version, string_offsets, code_block_offset, string_block_offset
 
-    def _unpack_strings(self, string_block_start: int, string_offsets: tuple) -> tuple:
-        """Unpack bin script strings.
+    def _unpack_strings(self, bin_data: bytes, data_001: bytes, string_block_start: int,
+                        string_offsets: tuple) -> ACPXStringBank:
+        """Unpack bin script strings. They are decoded lazily, on the first use.
+        bin_data -- data of the bin script.
+        data_001 -- data of 001's file or None.
         string_block_start -- start of the string section.
         string_offsets -- offsets of the strings in the section."""
-        strings = []
 
         if self.version == "ESCR_NEW":
-            try:
-                with open(self.file_001, 'rb') as sf:
-                    for offset in string_offsets:
-                        new_offset = string_block_start + offset
-                        sf.seek(new_offset, 0)
-                        new_string = self.command_lib.get_S(sf, self.bin_encoding)
-                        strings.append(new_string)
-            except FileNotFoundError:  # 0 strings case.
-                pass
-        else:
-            with open(self.bin_file, 'rb') as sf:
-                for offset in string_offsets:
-                    new_offset = string_block_start + 4 + offset
-                    sf.seek(new_offset, 0)
-                    new_string = self.command_lib.get_S(sf, self.bin_encoding)
-                    new_string = self.restring(new_string, "internal", "external")
-                    strings.append(new_string)
+            if data_001 is None:  # 0 strings case.
+                return ACPXStringBank(b'', (), self.bin_encoding)
+            strings_block = self.command_lib.decode_strings_block(data_001[string_block_start:])
+            return ACPXStringBank(strings_block, string_offsets, self.bin_encoding)
+
+        return ACPXStringBank(bin_data, string_offsets, self.bin_encoding, base=string_block_start + 4,
+                              converter=lambda string: self.restring(string, "internal", "external"))
 
-        return tuple(strings)
+    @staticmethod
+    def _get_code_end(bin_data: bytes, end_offset: int) -> int:
+        """Get the end of the code section, limited by the data length in case of broken end offset."""
+        if end_offset == 0:  # ESCR_END
+            end_offset = struct.unpack_from('Q', bin_data, 8)[0] + 24  # Script check offset.
+        return min(end_offset, len(bin_data))
 
-    def _extract_offsets(self, start_offset: int, end_offset: int) -> tuple:
+    def _extract_offsets(self, bin_data: bytes, start_offset: int, end_offset: int) -> tuple:
         """Get offsets from the code of the script.
+        bin_data -- data of the bin script.
         start_offset -- offset of the code section's start.
         end_offset -- offset of the code section's end."""
         offsets = []
+        dispatch_table = self.command_lib.dispatch_table
+        offset_beginner = self.command_lib.offset_beginner
+        end_offset = self._get_code_end(bin_data, end_offset)
 
-        with open(self.bin_file, 'rb') as af:
-            if end_offset == 0:  # ESCR_END
-                af.seek(8)
-                end_offset = struct.unpack('Q', af.read(8))[0] + 24  # Script check offset.
-
-            af.seek(start_offset, 0)
-
-            while True:
-                pointer = af.tell()
+        pointer = start_offset
+        while pointer < end_offset:  # String section start.
+            command = dispatch_table[bin_data[pointer]]
+            pointer += 1
 
-                if pointer >= end_offset:  # String section start.
-                    break
-                current_byte = af.read(1)
-                if current_byte == b'':  # In case of broken end offset.
-                    break
-                command_index = self.command_lib.find_command_index(current_byte)
-
-                if command_index != -1:
-                    command_args = self.command_lib.command_library[command_index][1]
-                    args_len = self.command_lib.get_len_from_structure(command_args)
-                    new_offsets = self.command_lib.extract_all_offsets(command_args, af)
-                    offsets.extend(new_offsets)
-                    af.seek(args_len, 1)
+            if command is not None:
+                for position, definer in command.offset_fields:
+                    offsets.append(struct.unpack_from(definer, bin_data, pointer + position)[0] + offset_beginner)
+                pointer += command.args_len
 
         return tuple(offsets)
 
-    def _disassemble_code(self, start_offset: int, end_offset: int) -> None:
-        """Disassemble the code of the script.
+    def _decode_code(self, bin_data: bytes, start_offset: int, end_offset: int):
+        """Decode the code of the script.
+        Yields (offset, compiled command, unpacked arguments) for every command
+        and (offset, None, free bytes) for every run of unknown bytes.
+        bin_data -- data of the bin script.
         start_offset -- offset of the code section's start.
         end_offset -- offset of the code section's end."""
+        dispatch_table = self.command_lib.dispatch_table
+        end_offset = self._get_code_end(bin_data, end_offset)
+
+        pointer = start_offset
+        free_bytes_offset = -1
+        while pointer < end_offset:  # String section start.
+            command = dispatch_table[bin_data[pointer]]
+
+            if command is None:  # "Free bytes" system. So the program don't break too easy.
+                if free_bytes_offset == -1:
+                    free_bytes_offset = pointer
+                pointer += 1
+            else:  # Such command is in the library.
+                if free_bytes_offset != -1:
+                    yield free_bytes_offset, None, bin_data[free_bytes_offset:pointer]
+                    free_bytes_offset = -1
+                yield pointer, command, command.args_struct.unpack_from(bin_data, pointer + 1)
+                pointer += 1 + command.args_len
+
+        if free_bytes_offset != -1:
+            yield free_bytes_offset, None, bin_data[free_bytes_offset:pointer]
+
+    def _get_instructions_offsets(self, instructions: list) -> tuple:
+        """Get offsets from the decoded code of the script.
+        instructions -- decoded code, see _decode_code."""
+        offsets = []
+        offset_beginner = self.command_lib.offset_beginner
+        for pointer, command, arguments in instructions:
+            if command is not None:
+                for field in command.label_fields:
+                    offsets.append(arguments[field] + offset_beginner)
+        return tuple(offsets)
 
-        with open(self.bin_file, 'rb') as af, open(self.txt_file, 'w', encoding=self.txt_encoding) as df:
-            if end_offset == 0:  # ESCR_END
-                af.seek(8)
-                end_offset = struct.unpack('Q', af.read(8))[0] + 24  # Script check offset.
-
-            af.seek(start_offset, 0)
-            free_bytes = b''
-            free_bytes_offset = 0
-
-            while True:
-                pointer = af.tell()
-
-                if pointer in self.command_lib.offset_bank:
-                    offset_index = self.command_lib.offset_bank.index(pointer)
-                    offset_num = self.command_lib.label_definer[offset_index]
-                    offset_str = "*{}".format(offset_num)
-                    print(offset_str, file=df)
-
-                if pointer >= end_offset:  # String section start.
-                    break
-                current_byte = af.read(1)
-                if current_byte == b'':  # In case of broken end offset.
-                    break
-                command_index = self.command_lib.find_command_index(current_byte)
-
-                if command_index == -1:  # "Free bytes" system. So the program don't break too easy.
-                    free_bytes += current_byte
-                    if free_bytes_offset == 0:
-                        free_bytes_offset = pointer
-                else:  # Such command is in the library.
-                    if free_bytes:
-                        free_bytes_str = '#0>{}{}'.format(free_bytes.hex(' '), self.offset_string(free_bytes_offset))
-                        print(free_bytes_str, file=df)
-                        free_bytes = b''
-                        free_bytes_offset = 0
-                    true_command_name = self.command_lib.get_true_name(command_index)
-                    command_str = "#1>{}{}".format(true_command_name, self.offset_string(pointer))
-                    print(command_str, file=df)
-                    commands_arguments = self.command_lib.get_args(af,
-                                                                   self.command_lib.command_library[command_index][1])
-                    json.dump(commands_arguments, df, ensure_ascii=False)
-                    df.write('\n')
-
-            if free_bytes:  # Kind of crutch, but oh well.
-                free_bytes_str = '#0>{}{}'.format(free_bytes.hex(' '), self.offset_string(free_bytes_offset))
-                print(free_bytes_str, file=df)
+    def _disassemble_code(self, df, instructions, start_offset: int) -> None:
+        """Disassemble the code of the script.
+        df -- disassembled text stream.
+        instructions -- decoded code, see _decode_code.
+        start_offset -- offset of the code section's start."""
+        resolve_args = self.command_lib.resolve_args
+        encode_args = json.JSONEncoder(ensure_ascii=False).encode
+        offset_string = self.offset_string if self._debug else (lambda offset: '')
+        chunk_lines = self.text_chunk_lines
+
+        lines = []  # Written by chunks.
+        pointer = start_offset
+        free_bytes = b''
+        free_bytes_offset = 0
+        labels = self.command_lib.get_sorted_labels()
+        labels.append((float('inf'), None))  # Sentinel, so the cursor never runs out.
+        label_cursor = 0
+
+        for pointer, command, arguments in instructions:
+            while labels[label_cursor][0] < pointer:  # Labels inside of the arguments are skipped.
+                label_cursor += 1
+
+            if command is None:  # Free bytes are written before the next command, after their labels.
+                free_bytes = arguments
+                free_bytes_offset = pointer
+                pointer += len(free_bytes)
+                while labels[label_cursor][0] < pointer:
+                    lines.append("*{}\n".format(labels[label_cursor][1]))
+                    label_cursor += 1
+                continue
+
+            if labels[label_cursor][0] == pointer:
+                lines.append("*{}\n".format(labels[label_cursor][1]))
+            if free_bytes:
+                lines.append('#0>{}{}\n'.format(free_bytes.hex(' '), offset_string(free_bytes_offset)))
                 free_bytes = b''
                 free_bytes_offset = 0
+            lines.append("#1>{}{}\n".format(command.true_name, offset_string(pointer)))
+            commands_arguments = resolve_args(list(arguments), command.string_fields, command.label_fields)
+            lines.append(encode_args(commands_arguments) + '\n')
+            pointer += 1 + command.args_len
+
+            if len(lines) >= chunk_lines:
+                df.writelines(lines)
+                lines.clear()
+
+        while labels[label_cursor][0] < pointer:
+            label_cursor += 1
+        if labels[label_cursor][0] == pointer:  # Label at the end of the code.
+            lines.append("*{}\n".format(labels[label_cursor][1]))
+        if free_bytes:  # Kind of crutch, but oh well.
+            lines.append('#0>{}{}\n'.format(free_bytes.hex(' '), offset_string(free_bytes_offset)))
+        df.writelines(lines)
 
     # Properties.
 
@@ -443,6 +1054,11 @@ class ACPXBinScript:
             neo = self.bin_file
         return neo + ".001"
 
+    @property
+    def ir_cache_file(self):
+        """Name of the text's sidecar."""
+        return self.txt_file + self.ir_cache_extension
+
     @property
     def version(self):
         """Script's version."""
@@ -466,6 +1082,21 @@ class ACPXBinScript:
 
     # Supplement methods.
 
+    def _get_code_block_start(self, string_number: int) -> int:
+        """Get the start of the code block of the assembled script."""
+        if self._version == "ESCR_NEW":
+            return 24
+        return 8 + 4 + 4 * string_number + 4
+
+    @staticmethod
+    def _get_data(data):
+        """Get bytes from bytes-like object or binary stream, None stays None."""
+        if data is None:
+            return None
+        if hasattr(data, 'read'):
+            return data.read()
+        return bytes(data)
+
     def offset_string(self, offset):
         off_str = " <{}>".format(offset) * self._debug
         return off_str
@@ -477,22 +1108,13 @@ class ACPXBinScript:
                 return entry[1](self.bin_encoding, self.txt_encoding)
         return None
 
-    @staticmethod
-    def read_args(filer) -> list:
-        """Read arguments from disassembled file."""
-        arg_line = ""
-        while True:
-            arg_line = filer.readline()
-            if arg_line[0] != '@':
-                break
-        arg_data = json.loads(arg_line)
-        return arg_data
-
     @classmethod
     def restring(cls, string, inner, outer):
-        in_strer = cls._string_format[inner]
-        out_strer = cls._string_format[outer]
-
-        for in_char, out_char in zip(in_strer, out_strer):
-            string = string.replace(in_char, out_char)
-        return string
+        """Convert the string between the formats of _string_format with a single translate."""
+        table = cls._string_tables.get((inner, outer))
+        if table is None:
+            table = {}
+            for in_char, out_char in zip(cls._string_format[inner], cls._string_format[outer]):
+                table.setdefault(ord(in_char), ord(out_char))  # As with the chained replace, the first one wins.
+            cls._string_tables[(inner, outer)] = table
+        return string.translate(table)
@@ -0,0 +1,307 @@
+import os
+import hmac
+import stat
+import time
+import json
+import base64
+import shutil
+import socket
+import secrets
+import tempfile
+import threading
+import socketserver
+import collections
+from acpx_script import ACPXBinScript
+
+
+# Protocol: JSON Lines over the socket, one request and one response per line.
+# Requests:
+# {"command": "assemble", "txt": "a.txt", "bin": "a.bin"} -- assemble the files.
+# {"command": "assemble", "text": "..."} -- assemble the text, response has base64 "bin_data" and "data_001".
+# {"command": "disassemble", "bin": "a.bin", "txt": "a.txt"} -- disassemble the files.
+# {"command": "disassemble", "bin_data": "...", "data_001": "..."} -- disassemble base64 data, response has "text".
+# {"command": "export_strings", "bin": "a.bin"} -- response has "strings": [[index, offset, string], ...].
+# {"command": "stats"} -- response has latency stats of every command and the builds stats.
+# {"command": "shutdown"} -- stop the service.
+# Every request may have "version", "bin_encoding" and "txt_encoding".
+# Requests over TCP must have "token" of the service, any local process can connect there. Unix socket is
+# for its owner only, so there the token is needed only if it is given to the service.
+# Response is {"ok": true, "elapsed_ms": ..., ...} or {"ok": false, "error": "..."}.
+
+
+class ACPXService:
+    """Resident local service for (dis)assembling: no interpreter start and no imports per script,
+    builds of the recent scripts are kept in memory, so when only the strings of the text are changed,
+    the text is not parsed and the code is not assembled again."""
+
+    default_host = "127.0.0.1"
+    default_port = 57031
+    default_unix_socket = os.path.join(os.path.expanduser("~"), ".acpx_service.sock")
+    default_token_file = os.path.join(os.path.expanduser("~"), ".acpx_service_token")
+    default_cache_scripts = 64  # Recent scripts with the build kept in memory.
+
+    def __init__(self, host: str = None, port: int = None, unix_socket: str = None, token: str = None,
+                 cache_scripts: int = None) -> None:
+        """Initialize ACPXService class.
+        host -- host to listen on.
+        port -- port to listen on.
+        unix_socket -- name of Unix socket to listen on instead of the host and the port.
+        If none of them is given, default_unix_socket is used where there are Unix sockets.
+        token -- token, that the requests must have. If None, for TCP the random one is made
+        and written to default_token_file.
+        cache_scripts -- number of the recent scripts kept in memory."""
+        if (unix_socket is None) and (host is None) and (port is None) and hasattr(socket, "AF_UNIX"):
+            unix_socket = self.default_unix_socket
+        self.host = host if host is not None else self.default_host
+        self.port = port if port is not None else self.default_port
+        self.unix_socket = unix_socket
+        self.token = token
+        self.cache_scripts = cache_scripts if cache_scripts is not None else self.default_cache_scripts
+
+        self._builds = collections.OrderedDict()  # (bin script, settings) -> build of the last assembling.
+        self._stats = {}  # Command -> [number, total seconds, max seconds].
+        self._builds_stats = {"code_reused": 0, "code_assembled": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def serve_forever(self) -> None:
+        """Listen and handle the requests until shutdown."""
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    response = service.handle_line(line)
+                    self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+                    if response.get("shutdown"):
+                        threading.Thread(target=service.shutdown, daemon=True).start()
+                        return
+
+        if self.unix_socket is not None:
+            self._check_unix_socket()
+            # Socket is made in the private directory (0700) and moved to its place only after chmod,
+            # so no one else can connect in between. Umask is not touched, it is common for all the threads.
+            private_directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(self.unix_socket)))
+            base_class = socketserver.ThreadingUnixStreamServer
+            address = os.path.join(private_directory, "service.sock")
+        else:
+            if self.token is None:
+                self.token = secrets.token_hex(16)
+                self.save_token(self.token)
+            base_class = socketserver.ThreadingTCPServer
+            address = (self.host, self.port)
+
+        class Server(base_class):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        if self.unix_socket is not None:
+            try:
+                server = Server(address, Handler)
+                try:
+                    os.chmod(address, 0o600)
+                    os.replace(address, self.unix_socket)
+                except OSError:
+                    server.server_close()
+                    raise
+            finally:
+                shutil.rmtree(private_directory, ignore_errors=True)
+        else:
+            server = Server(address, Handler)
+        with server:
+            self._server = server
+            server.serve_forever()
+        if self.unix_socket is not None:
+            os.remove(self.unix_socket)
+
+    def _check_unix_socket(self) -> None:
+        """Remove the socket of the stopped service, but refuse to take over the running one."""
+        try:
+            mode = os.stat(self.unix_socket).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError("{} is not a socket!".format(self.unix_socket))
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.unix_socket)
+        except ConnectionRefusedError:  # Nobody listens, the service was not stopped properly.
+            os.remove(self.unix_socket)
+            return
+        finally:
+            probe.close()
+        raise OSError("Service is already running on {}!".format(self.unix_socket))
+
+    def shutdown(self) -> None:
+        """Stop the service."""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def handle_line(self, line: bytes) -> dict:
+        """Handle one request line and get the response."""
+        start = time.perf_counter()
+        command = None
+        try:
+            request = json.loads(line)
+            if (self.token is not None) and not hmac.compare_digest(str(request.get("token")).encode('utf-8'),
+                                                                    self.token.encode('utf-8')):
+                raise PermissionError("Incorrect token!")
+            command = request.get("command")
+            handler = self._handlers.get(command)
+            if handler is None:
+                raise ValueError("Unknown command: {}!".format(command))
+            response = handler(self, request)
+            response["ok"] = True
+        except Exception as ex:
+            response = {"ok": False, "error": str(ex)}
+        elapsed = time.perf_counter() - start
+        response["elapsed_ms"] = elapsed * 1000
+        if command in self._handlers:
+            with self._lock:
+                stats = self._stats.setdefault(command, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+        return response
+
+    # Commands.
+
+    def _assemble(self, request: dict) -> dict:
+        """Assemble the files or the text."""
+        if "text" in request:
+            script_obj = self._get_script(request)
+            bin_data, data_001 = script_obj.assemble_data(request["text"])
+            return {"bin_data": base64.b64encode(bin_data).decode('ascii'),
+                    "data_001": None if data_001 is None else base64.b64encode(data_001).decode('ascii')}
+
+        script_obj = self._get_script(request, request["bin"], request["txt"])
+        key = (os.path.abspath(script_obj.bin_file), script_obj.version, script_obj.txt_encoding)
+        with open(script_obj.txt_file, 'r', encoding=script_obj.txt_encoding, errors='replace') as df:
+            text = df.read()
+        with self._lock:
+            build = self._builds.get(key)
+        bin_data, data_001, new_build = script_obj.assemble_text(text, build)
+        os.makedirs(os.path.dirname(os.path.abspath(script_obj.bin_file)), exist_ok=True)
+        script_obj.save_data(bin_data, data_001)
+
+        with self._lock:
+            self._builds_stats["code_reused" if new_build is build else "code_assembled"] += 1
+            self._builds[key] = new_build
+            self._builds.move_to_end(key)  # Recent ones are the last.
+            while len(self._builds) > self.cache_scripts:
+                self._builds.popitem(last=False)
+        return {"bin": script_obj.bin_file}
+
+    def _disassemble(self, request: dict) -> dict:
+        """Disassemble the files or the data."""
+        if "bin_data" in request:
+            script_obj = self._get_script(request)
+            data_001 = request.get("data_001")
+            text = script_obj.disassemble_data(base64.b64decode(request["bin_data"]),
+                                               None if data_001 is None else base64.b64decode(data_001))
+            return {"text": text, "version": script_obj.version}
+
+        script_obj = self._get_script(request, request["bin"], request["txt"])
+        os.makedirs(os.path.dirname(os.path.abspath(script_obj.txt_file)), exist_ok=True)
+        script_obj.disassemble()
+        return {"txt": script_obj.txt_file, "version": script_obj.version}
+
+    def _export_strings(self, request: dict) -> dict:
+        """Export strings of the script."""
+        script_obj = self._get_script(request, request["bin"])
+        return {"strings": script_obj.export_strings()}
+
+    def _get_stats(self, request: dict) -> dict:
+        """Get latency stats of every command and the builds stats."""
+        with self._lock:
+            commands = {command: {"number": number, "mean_ms": total / number * 1000, "max_ms": maximum * 1000}
+                        for command, (number, total, maximum) in self._stats.items()}
+            builds = dict(self._builds_stats, scripts=len(self._builds))
+        return {"commands": commands, "builds": builds}
+
+    def _shutdown(self, request: dict) -> dict:
+        """Stop the service after the response."""
+        return {"shutdown": True}
+
+    _handlers = {
+        "assemble": _assemble,
+        "disassemble": _disassemble,
+        "export_strings": _export_strings,
+        "stats": _get_stats,
+        "shutdown": _shutdown,
+    }
+
+    # Technical methods.
+
+    @classmethod
+    def save_token(cls, token: str, token_file: str = None) -> None:
+        """Write the token to the file, readable by its owner only.
+        token_file -- name of the file or None for default_token_file."""
+        token_file = token_file if token_file is not None else cls.default_token_file
+        descriptor = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(token_file, 0o600)  # Already existing file keeps its mode otherwise.
+        with open(descriptor, 'w', encoding='ascii') as tf:
+            tf.write(token)
+
+    @classmethod
+    def load_token(cls, token_file: str = None):
+        """Read the token from the file or get None if there is no such file.
+        token_file -- name of the file or None for default_token_file."""
+        token_file = token_file if token_file is not None else cls.default_token_file
+        try:
+            with open(token_file, 'r', encoding='ascii') as tf:
+                return tf.read().strip()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _get_script(request: dict, bin_file: str = None, txt_file: str = None) -> ACPXBinScript:
+        """Get the script object with the settings of the request."""
+        return ACPXBinScript(bin_file, txt_file, version=request.get("version"),
+                             bin_encoding=request.get("bin_encoding", "cp932"),
+                             txt_encoding=request.get("txt_encoding", "cp932"))
+
+
+class ACPXServiceClient:
+    """Client of ACPXService."""
+
+    def __init__(self, host: str = None, port: int = None, unix_socket: str = None, token: str = None) -> None:
+        """Initialize ACPXServiceClient class. For arguments see ACPXService.
+        For TCP without the token, the one of ACPXService.default_token_file is sent."""
+        if (unix_socket is None) and (host is None) and (port is None) and hasattr(socket, "AF_UNIX"):
+            unix_socket = ACPXService.default_unix_socket
+        if unix_socket is not None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(unix_socket)
+        else:
+            if token is None:
+                token = ACPXService.load_token()
+            self._socket = socket.create_connection((host if host is not None else ACPXService.default_host,
+                                                     port if port is not None else ACPXService.default_port))
+        self.token = token
+        self._file = self._socket.makefile('rwb')
+
+    def request(self, command: str, **arguments) -> dict:
+        """Send the request and get the response."""
+        if self.token is not None:
+            arguments["token"] = self.token
+        self._file.write(json.dumps(dict(arguments, command=command), ensure_ascii=False).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Service closed the connection!")
+        return json.loads(line)
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
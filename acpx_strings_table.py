@@ -0,0 +1,110 @@
+import os
+import json
+import threading
+from acpx_script import ACPXBinScript
+
+
+# Strings table is JSON Lines file, one string per line:
+# {"script": "relative/path/to/script.bin", "index": 0, "offset": 0, "string": "..."}
+# Script, index and offset are the string's id. Offset is checked on import, so the table
+# can only be imported to the same scripts, it was exported from.
+
+
+class ACPXStringsTable:
+    """Strings of the whole directory of scripts in one table, for translation."""
+
+    format_name = "bin"
+
+    def __init__(self, table_file: str, version: str = None, bin_encoding: str = "cp932",
+                 table_encoding: str = "utf-8") -> None:
+        """Initialize ACPXStringsTable class.
+        table_file -- name of the table file.
+        version -- version of the scripts.
+        bin_encoding -- encoding of the scripts.
+        table_encoding -- encoding of the table file."""
+        self.table_file = table_file
+        self.version = version
+        self.bin_encoding = bin_encoding
+        self.table_encoding = table_encoding
+
+    def export_directory(self, directory: str) -> int:
+        """Export strings of all scripts in the directory to the table and get the number of strings.
+        The table is replaced only when all the scripts are exported.
+        directory -- directory with the scripts."""
+        encode_entry = json.JSONEncoder(ensure_ascii=False).encode
+        number = 0
+        temp_file = "{}.{}.{}.tmp".format(self.table_file, os.getpid(), threading.get_ident())
+        try:
+            with open(temp_file, 'w', encoding=self.table_encoding) as tf:
+                for script_id, bin_file in self.get_scripts(directory):
+                    script_obj = ACPXBinScript(bin_file, version=self.version, bin_encoding=self.bin_encoding)
+                    try:
+                        strings = script_obj.export_strings()
+                    except Exception as ex:
+                        raise ValueError("Incorrect script {}: {}".format(script_id, ex)) from ex
+                    lines = []
+                    for index, offset, string in strings:
+                        lines.append(encode_entry({"script": script_id, "index": index, "offset": offset,
+                                                   "string": string}) + '\n')
+                    tf.writelines(lines)
+                    number += len(lines)
+            os.replace(temp_file, self.table_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        return number
+
+    def import_directory(self, directory: str) -> int:
+        """Import the table to the scripts in the directory and get the number of changed scripts.
+        Strings, that are absent in the table, are left as they are. Scripts are written only when all of them
+        are imported in memory, so the incorrect table changes nothing.
+        directory -- directory with the scripts."""
+        table = {}  # Script -> {index: (offset, string)}.
+        with open(self.table_file, 'r', encoding=self.table_encoding) as tf:
+            for line_number, line in enumerate(tf, 1):
+                if line.strip() == '':
+                    continue
+                try:
+                    entry = json.loads(line)
+                    table.setdefault(entry["script"], {})[entry["index"]] = (entry["offset"], entry["string"])
+                except (ValueError, KeyError, TypeError) as ex:
+                    raise ValueError("Incorrect entry at line {}: {}".format(line_number, ex)) from None
+
+        root = os.path.realpath(directory)
+        scripts = []  # (script object, bin script data, 001's file data) of the changed scripts.
+        for script_id, entries in table.items():
+            bin_file = os.path.realpath(os.path.join(root, *script_id.split('/')))
+            if os.path.commonpath((root, bin_file)) != root:
+                raise ValueError("Script {} is outside the directory!".format(script_id))
+            script_obj = ACPXBinScript(bin_file, version=self.version, bin_encoding=self.bin_encoding)
+            old_strings = script_obj.export_strings()
+            new_strings = [string for index, offset, string in old_strings]
+            for index, (offset, string) in entries.items():
+                if (not 0 <= index < len(old_strings)) or (old_strings[index][1] != offset):
+                    raise ValueError("String {} of {} is not in the script (offset {})!".format(
+                        index, script_id, offset))
+                new_strings[index] = string
+            if new_strings != [string for index, offset, string in old_strings]:
+                try:
+                    scripts.append((script_obj, *script_obj.import_strings_data(new_strings)))
+                except Exception as ex:
+                    raise ValueError("Incorrect strings of {}: {}".format(script_id, ex)) from ex
+
+        for script_obj, bin_data, data_001 in scripts:
+            script_obj.save_data(bin_data, data_001)
+        return len(scripts)
+
+    @classmethod
+    def get_scripts(cls, directory: str):
+        """Get (script's id, script's file) of all .bin scripts in the directory, sorted.
+        directory -- directory with the scripts."""
+        scripts = []
+        for root, dirs, files in os.walk(directory):
+            for file_name in files:
+                if os.path.splitext(file_name)[1] != "." + cls.format_name:
+                    continue
+                bin_file = os.path.join(root, file_name)
+                script_id = os.path.relpath(bin_file, directory).replace(os.sep, '/')
+                scripts.append((script_id, bin_file))
+        scripts.sort()
+        return scripts
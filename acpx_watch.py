@@ -0,0 +1,144 @@
+import os
+import time
+from acpx_script import ACPXBinScript
+from acpx_build_manifest import ACPXBuildManifest
+
+
+class ACPXWatcher:
+    """Watch the directory of texts and assemble the saved ones at once.
+    Script objects (with their command libraries) and the builds of the assembled scripts are kept in memory,
+    so when only the strings of the text are changed, the text is not parsed and the code is not assembled again."""
+
+    default_interval = 0.02  # Between the polls, in seconds.
+    default_debounce = 0.02  # Text must be untouched for so long before the assembling, in seconds.
+    # Saved text is seen by the next poll and assembled by the one after it: 40 ms at worst before the assembling.
+    txt_extension = ".txt"
+    format_name = "bin"
+
+    def __init__(self, txt_directory: str, bin_directory: str, version: str = None, bin_encoding: str = "cp932",
+                 txt_encoding: str = "cp932", interval: float = None, debounce: float = None,
+                 on_build=None) -> None:
+        """Initialize ACPXWatcher class.
+        txt_directory -- directory with the texts.
+        bin_directory -- directory with the assembled scripts.
+        version -- version of the scripts.
+        bin_encoding -- encoding of the scripts.
+        txt_encoding -- encoding of the texts.
+        interval -- time between the polls, in seconds.
+        debounce -- time the text must be untouched before the assembling, in seconds.
+        on_build -- function (bin script, text, exception or None, time of assembling) to call after every
+        assembling or None to print the result."""
+        self.txt_directory = os.path.abspath(txt_directory)
+        self.bin_directory = os.path.abspath(bin_directory)
+        self.version = version
+        self.bin_encoding = bin_encoding
+        self.txt_encoding = txt_encoding
+        self.interval = interval if interval is not None else self.default_interval
+        self.debounce = debounce if debounce is not None else self.default_debounce
+        self.on_build = on_build if on_build is not None else self.print_build
+        self.manifest = ACPXBuildManifest(self.bin_directory)
+
+        self._pending = {}  # Text -> time of its last change.
+        self._warm = {}  # Text -> (script object, build of the last assembling).
+        self._running = False
+        self._states = self._scan()  # Text -> (mtime, size) as of the last poll.
+
+    def run(self) -> None:
+        """Watch until stop is called (from another thread) or KeyboardInterrupt."""
+        self._running = True
+        try:
+            while self._running:
+                self.poll()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._running = False
+
+    def stop(self) -> None:
+        """Stop watching."""
+        self._running = False
+
+    def poll(self) -> list:
+        """Look for the changed texts once and assemble those of them, which are not touched for debounce time.
+        Returns...
+        list of the assembled texts."""
+        now = time.monotonic()
+        states = self._scan()
+        for txt_file, state in states.items():
+            if self._states.get(txt_file) != state:
+                self._pending[txt_file] = now
+        for txt_file in self._states.keys() - states.keys():  # Removed texts.
+            self._pending.pop(txt_file, None)
+            self._warm.pop(txt_file, None)
+        self._states = states
+
+        ready = [txt_file for txt_file, changed in self._pending.items() if now - changed >= self.debounce]
+        for txt_file in ready:
+            del self._pending[txt_file]
+            self.build(txt_file)
+        if ready:
+            self.manifest.save()
+        return ready
+
+    def build(self, txt_file: str) -> None:
+        """Assemble the script from the text.
+        txt_file -- name of the text file."""
+        scr_file = self.get_scr_file(txt_file)
+        start = time.perf_counter()
+        error = None
+        try:
+            script_obj, build = self._warm.get(txt_file, (None, None))
+            if script_obj is None:
+                os.makedirs(os.path.dirname(scr_file), exist_ok=True)
+                script_obj = ACPXBinScript(scr_file, txt_file, version=self.version, bin_encoding=self.bin_encoding,
+                                           txt_encoding=self.txt_encoding)
+            with open(txt_file, 'rb') as df:
+                text = df.read()
+            txt_hash = self.manifest.get_data_hash(text)  # Of the assembled text, it may be saved again meanwhile.
+            bin_data, data_001, build = script_obj.assemble_text(
+                text.decode(self.txt_encoding, errors='replace'), build)
+            script_obj.save_data(bin_data, data_001)
+            self._warm[txt_file] = (script_obj, build)
+            self.manifest.record(scr_file, txt_hash, script_obj.file_001,
+                                 (script_obj.version, self.bin_encoding, self.txt_encoding))
+        except Exception as ex:
+            self._warm.pop(txt_file, None)
+            self.manifest.forget(scr_file)
+            error = ex
+        self.on_build(scr_file, txt_file, error, time.perf_counter() - start)
+
+    def get_scr_file(self, txt_file: str) -> str:
+        """Get name of the bin script of the text."""
+        basic_path = os.path.relpath(txt_file, self.txt_directory)
+        return os.path.join(self.bin_directory, os.path.splitext(basic_path)[0] + "." + self.format_name)
+
+    def _scan(self) -> dict:
+        """Get (mtime, size) of every text in the directory."""
+        states = {}
+        directories = [self.txt_directory]
+        while directories:
+            try:
+                entries = list(os.scandir(directories.pop()))
+            except OSError:  # Removed while scanning.
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        directories.append(entry.path)
+                    elif entry.name.endswith(self.txt_extension):
+                        stat = entry.stat()
+                        states[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    continue
+        return states
+
+    @staticmethod
+    def print_build(scr_file: str, txt_file: str, error, elapsed: float) -> None:
+        """Print the result of the assembling."""
+        if error is None:
+            print("Assembling of {0} succeed ({1:.0f} ms)./Ассемблирование {0} прошло успешно ({1:.0f} мс).".format(
+                scr_file, elapsed * 1000))
+        else:
+            print("Assembling of {0} error./Ассемблирование {0} не удалось.".format(scr_file))
+            print(txt_file + ": " + str(error))
@@ -0,0 +1,46 @@
+"""Micro-benchmark of the command dispatch: linear search of the library against the dispatch table.
+Usage: python benchmarks/bench_dispatch.py [number of bytes]"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acpx_command_lib import ACPXCommandLibVer1_00, ACPXCommandLibVerNEW
+
+
+def linear_dispatch(lib, data: bytes) -> int:
+    """Dispatch as it was before the table: hex name, linear search, re-walk of the signature."""
+    summ = 0
+    for byte in data:
+        hexer = lib.to_fully_hex(byte)
+        for i in range(len(lib.command_library)):
+            if hexer == lib.command_library[i][0]:
+                summ += lib.get_len_from_structure(lib.command_library[i][1])
+                break
+    return summ
+
+
+def table_dispatch(lib, data: bytes) -> int:
+    """Dispatch with the byte-indexed table."""
+    summ = 0
+    dispatch_table = lib.dispatch_table
+    for byte in data:
+        command = dispatch_table[byte]
+        if command is not None:
+            summ += command.args_len
+    return summ
+
+
+def main(size: int) -> None:
+    data = bytes(range(256)) * (size // 256)
+    for lib in (ACPXCommandLibVer1_00, ACPXCommandLibVerNEW):
+        assert linear_dispatch(lib, data) == table_dispatch(lib, data)
+        linear = min(timeit.repeat(lambda: linear_dispatch(lib, data), number=1, repeat=5))
+        table = min(timeit.repeat(lambda: table_dispatch(lib, data), number=1, repeat=5))
+        print("{}, {} bytes: linear search {:.2f} ms, dispatch table {:.2f} ms, {:.0f}x.".format(
+            lib.__name__, len(data), linear * 1000, table * 1000, linear / table))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10240)
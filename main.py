@@ -1,6 +1,7 @@
 # Made by Tester Testerov.
 
-from acpx_bin_script_gui import ACPXBinScriptGUI
+import sys
+import multiprocessing
 
 debug = False
 
@@ -28,11 +29,20 @@ def test(bin_script, txt_file):
 
 
 def start_gui():
+    from acpx_bin_script_gui import ACPXBinScriptGUI
     gui = ACPXBinScriptGUI()
     return True
 
 
+def start_cli(argv):
+    from acpx_cli import main
+    return main(argv)
+
+
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # For the worker processes of the frozen executable.
+    if len(sys.argv) > 1:  # Headless mode, see acpx_cli.py.
+        sys.exit(start_cli(sys.argv[1:]))
     if debug:
         bin_script = "s18_blend.bin"
         bak_bin_script = "s18_blend.bin.bak"
@@ -0,0 +1,84 @@
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import unittest
+import unittest.mock
+import acpx_async
+from acpx_async import ACPXAsyncScript, ACPXAsyncBatch
+from tests.test_acpx_script import SCRIPTS, get_data_file, read_data
+
+
+def slow_assemble_job(settings: tuple, text: str) -> tuple:
+    """Assemble job, which takes its time."""
+    time.sleep(0.3)
+    return acpx_async.ACPXBinScript(version=settings[0]).assemble_data(text)
+
+
+class ACPXAsyncTest(unittest.TestCase):
+    """Asynchronous (dis)assembling against the synchronous one."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_same_as_sync(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                bin_file = os.path.join(self.directory, name + ".bin")
+                txt_file = os.path.join(self.directory, name + ".txt")
+                asyncio.run(ACPXAsyncScript(bin_file, get_data_file(name + ".txt"), version=version).assemble())
+                self.assertEqual(read_data(bin_file), read_data(get_data_file(name + ".bin")))
+                asyncio.run(ACPXAsyncScript(get_data_file(name + ".bin"), txt_file, version=version).disassemble())
+                self.assertEqual(read_data(txt_file), read_data(get_data_file(name + ".dis.txt")))
+
+    def test_max_parallel(self):
+        running = [0, 0]  # Now, maximum.
+
+        async def fake_assemble(script, timeout=None):
+            running[0] += 1
+            running[1] = max(running)
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+
+        pairs = [(os.path.join(self.directory, "{}.bin".format(i)), get_data_file("new.txt")) for i in range(6)]
+        with unittest.mock.patch.object(ACPXAsyncScript, "assemble", fake_assemble):
+            results = asyncio.run(ACPXAsyncBatch(max_parallel=2).assemble(pairs, version="ESCR_NEW"))
+        self.assertEqual(results, [None] * 6)
+        self.assertEqual(running[1], 2)
+
+    def test_timeout(self):
+        bin_file = os.path.join(self.directory, "new.bin")
+        script = ACPXAsyncScript(bin_file, get_data_file("new.txt"), version="ESCR_NEW")
+        with unittest.mock.patch.object(acpx_async, "assemble_job", slow_assemble_job):
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(script.assemble(timeout=0.05))
+        self.assertFalse(os.path.exists(bin_file))
+
+    def test_cancel(self):
+        bin_file = os.path.join(self.directory, "new.bin")
+        script = ACPXAsyncScript(bin_file, get_data_file("new.txt"), version="ESCR_NEW")
+
+        async def cancel():
+            task = asyncio.create_task(script.assemble())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await task
+
+        with unittest.mock.patch.object(acpx_async, "assemble_job", slow_assemble_job):
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(cancel())
+        self.assertFalse(os.path.exists(bin_file))
+
+    def test_errors_are_results(self):
+        pairs = [(os.path.join(self.directory, "new.bin"), get_data_file("new.txt")),
+                 (os.path.join(self.directory, "absent.bin"), os.path.join(self.directory, "absent.txt"))]
+        results = asyncio.run(ACPXAsyncBatch(max_parallel=2).assemble(pairs, version="ESCR_NEW"))
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], FileNotFoundError)
+        self.assertEqual(read_data(pairs[0][0]), read_data(get_data_file("new.bin")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from acpx_build_manifest import ACPXBuildManifest
+from acpx_jobs import run_job
+from tests.test_acpx_script import get_data_file
+
+
+class ACPXBuildManifestTest(unittest.TestCase):
+    """Up to date checks of the assembled scripts."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.txt_file = os.path.join(self.directory, "new.txt")
+        self.scr_file = os.path.join(self.directory, "bin", "new.bin")
+        shutil.copy(get_data_file("new.txt"), self.txt_file)
+        self.manifest = ACPXBuildManifest(os.path.join(self.directory, "manifest.json"))
+        self.file_001 = os.path.join(self.directory, "bin", "new.001")
+        self.settings = ("ESCR_NEW", "cp932", "cp932")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assemble(self):
+        settings = {"version": "ESCR_NEW", "bin_encoding": "cp932", "txt_encoding": "cp932", "ir_cache": False}
+        scr_file, txt_file, error, size, cache_hit, txt_hash = run_job(
+            ("assemble", self.scr_file, self.txt_file, settings))
+        self.assertIsNone(error)
+        return txt_hash
+
+    def test_up_to_date(self):
+        self.manifest.record(self.scr_file, self.assemble(), self.file_001, self.settings)
+        self.assertTrue(self.manifest.is_up_to_date(self.scr_file, self.txt_file, self.file_001, self.settings))
+        self.assertFalse(self.manifest.is_up_to_date(self.scr_file, self.txt_file, self.file_001,
+                                                     ("ESCR_NEW", "cp932", "utf-8")))
+
+    def test_text_saved_while_assembling(self):
+        txt_hash = self.assemble()
+        with open(self.txt_file, 'a', encoding="cp932") as df:  # Saved before the job is reported.
+            df.write('\n')
+        self.manifest.record(self.scr_file, txt_hash, self.file_001, self.settings)
+        self.assertFalse(self.manifest.is_up_to_date(self.scr_file, self.txt_file, self.file_001, self.settings))
+
+    def test_interrupted_save(self):
+        self.manifest.record(self.scr_file, self.assemble(), self.file_001, self.settings)
+        self.manifest.save()
+        with open(self.manifest.manifest_file, 'rb') as mf:
+            saved = mf.read()
+        self.manifest.forget(self.scr_file)
+        with unittest.mock.patch.object(json, "dump", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.manifest.save()
+        with open(self.manifest.manifest_file, 'rb') as mf:
+            self.assertEqual(mf.read(), saved)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["bin", "manifest.json.acpx_manifest.json", "new.txt"])
+        self.assertTrue(ACPXBuildManifest(self.manifest.output_directory).is_up_to_date(
+            self.scr_file, self.txt_file, self.file_001, self.settings))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+import acpx_cli
+from acpx_cli import ACPXBatch
+from tests.test_acpx_script import get_data_file, read_data
+
+original_run_job = acpx_cli.run_job
+
+
+def dying_job(job: tuple) -> tuple:
+    """Job, whose worker dies on the text named "die.txt"."""
+    if os.path.basename(job[2]) == "die.txt":
+        os._exit(1)
+    return original_run_job(job)
+
+
+class ACPXBatchTest(unittest.TestCase):
+    """Pairs of the scripts and the texts in the directories."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.txt_directory = os.path.join(self.directory, "txt")
+        self.bin_directory = os.path.join(self.directory, "bin")
+        os.makedirs(os.path.join(self.txt_directory, "sub"))
+        shutil.copy(get_data_file("new.txt"), os.path.join(self.txt_directory, "sub", "new.txt"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ir_cache_is_not_text(self):
+        batch = ACPXBatch(workers=1, version="ESCR_NEW", ir_cache=True, verbose=False)
+        for _ in range(2):
+            self.assertTrue(batch.assemble(self.txt_directory, self.bin_directory))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.txt_directory, "sub"))), ["new.txt", "new.txt.acpxc"])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.bin_directory, "sub"))), ["new.001", "new.bin"])
+        self.assertEqual(read_data(os.path.join(self.bin_directory, "sub", "new.bin")),
+                         read_data(get_data_file("new.bin")))
+        self.assertEqual(ACPXBatch.get_assemble_pairs(self.txt_directory, self.bin_directory),
+                         [(os.path.join(self.bin_directory, "sub", "new.bin"),
+                           os.path.join(self.txt_directory, "sub", "new.txt"))])
+
+    def test_only_bin_is_script(self):
+        scr_directory = os.path.join(self.directory, "scripts")
+        os.makedirs(scr_directory)
+        for name in ("new.bin", "new.001", "new.txt", "new.dis.txt"):
+            shutil.copy(get_data_file(name), os.path.join(scr_directory, name))
+        self.assertEqual(ACPXBatch.get_disassemble_pairs(scr_directory, self.txt_directory),
+                         [(os.path.join(scr_directory, "new.bin"), os.path.join(self.txt_directory, "new.txt"))])
+
+    def test_dead_worker(self):
+        for name in ("a", "die", "c"):
+            shutil.copy(get_data_file("new.txt"), os.path.join(self.txt_directory, name + ".txt"))
+        out = io.StringIO()
+        batch = ACPXBatch(workers=1, queue_size=1, version="ESCR_NEW", verbose=False, out=out)
+        with unittest.mock.patch.object(acpx_cli, "run_job", dying_job):
+            self.assertFalse(batch.assemble(self.txt_directory, self.bin_directory))
+        self.assertIn("4 files, 3 succeed, 1 failed", out.getvalue())
+        self.assertIn("FAILED {}".format(os.path.join(self.bin_directory, "die.bin")), out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.bin_directory, "c.bin")))
+
+
+if __name__ == '__main__':
+    unittest.main()
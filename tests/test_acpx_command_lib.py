@@ -0,0 +1,50 @@
+import io
+import struct
+import unittest
+from acpx_command_lib import ACPXCommandLib, ACPXSegmentedStruct
+
+
+class MixedOrderCommandLib(ACPXCommandLib):
+    """Library with the structures, which mix byte orders."""
+
+    command_library = (
+        ('01', '>Is', 'BIG_STRING'),
+        ('02', '<I>H', 'LITTLE_BIG'),
+        ('03', '>HIB', 'BIG'),
+    )
+
+
+class ACPXCommandLibTest(unittest.TestCase):
+    """Argument codecs against the per-field decoding."""
+
+    def setUp(self):
+        self.lib = MixedOrderCommandLib("cp932", "cp932", string_bank=["zero", "one", "two"])
+
+    def test_mixed_byte_orders(self):
+        cases = (
+            ('>Is', struct.pack('>I', 0x01020304) + struct.pack('=I', 2), [0x01020304, "two"]),
+            ('<I>H', struct.pack('<I', 0x01020304) + struct.pack('>H', 0x0506), [0x01020304, 0x0506]),
+        )
+        for structure, data, arguments in cases:
+            with self.subTest(structure=structure):
+                self.assertIsInstance(self.lib.get_args_codec(structure)[0], ACPXSegmentedStruct)
+                self.assertEqual(self.lib.get_args(io.BytesIO(data), structure), arguments)
+                self.lib.string_bank = ["zero", "one"]  # The next linked string is the 2nd.
+                self.assertEqual(self.lib.set_args(arguments, structure), data)
+
+    def test_single_byte_order(self):
+        data = struct.pack('>HIB', 1, 2, 3)
+        self.assertIsInstance(self.lib.get_args_codec('>HIB')[0], struct.Struct)
+        self.assertEqual(self.lib.get_args(io.BytesIO(data), '>HIB'), [1, 2, 3])
+
+    def test_compiled_commands(self):
+        command = self.lib.commands_by_name['LITTLE_BIG']
+        buffer = bytearray(command.code_struct.size)
+        self.assertEqual(self.lib.set_command(buffer, 0, command, [7, 8]), 7)
+        self.assertEqual(bytes(buffer), b'\x02' + struct.pack('<I', 7) + struct.pack('>H', 8))
+        self.assertEqual(self.lib.get_command_args(buffer, 1, command), [7, 8])
+        self.assertIs(self.lib.dispatch_table[0x02], command)
+
+
+if __name__ == '__main__':
+    unittest.main()
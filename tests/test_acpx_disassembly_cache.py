@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+from acpx_script import ACPXBinScript
+from acpx_disassembly_cache import ACPXDisassemblyCache
+from tests.test_acpx_script import SCRIPTS, get_data_file, read_data
+
+
+class ACPXDisassemblyCacheTest(unittest.TestCase):
+    """Cached texts against the disassembled ones."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = ACPXDisassemblyCache(os.path.join(self.directory, "cache"))
+
+    def test_hit_is_disassembly(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                for txt_encoding in ("cp932", "utf-8"):  # Other encoding is other text.
+                    for hit in (False, True):
+                        txt_file = os.path.join(self.directory, "{}.{}.{}.txt".format(name, txt_encoding, hit))
+                        hits = self.cache.hits
+                        script_obj = ACPXBinScript(get_data_file(name + ".bin"), txt_file, version=version,
+                                                   txt_encoding=txt_encoding)
+                        script_obj.disassemble(cache=self.cache)
+                        self.assertEqual(self.cache.hits - hits, int(hit))
+                        self.assertEqual(script_obj.version, version)
+                        reference_file = os.path.join(self.directory, "reference.txt")
+                        ACPXBinScript(get_data_file(name + ".bin"), reference_file, version=version,
+                                      txt_encoding=txt_encoding).disassemble()
+                        self.assertEqual(read_data(txt_file), read_data(reference_file))
+
+    def test_key(self):
+        bin_data = read_data(get_data_file("new.bin"))
+        data_001 = read_data(get_data_file("new.001"))
+        settings = ("ESCR_NEW", "cp932", "cp932")
+        key = self.cache.get_key(bin_data, data_001, settings)
+        self.assertEqual(self.cache.get_key(bin_data, data_001, settings), key)
+        other_keys = [
+            self.cache.get_key(bin_data, data_001, ("ESCR1_00", "cp932", "cp932")),
+            self.cache.get_key(bin_data, data_001, ("ESCR_NEW", "shift_jis", "cp932")),
+            self.cache.get_key(bin_data, data_001, ("ESCR_NEW", "cp932", "utf-8")),
+            self.cache.get_key(bin_data, data_001[:-1] + b'\x00', settings),
+            self.cache.get_key(bin_data, None, settings),
+        ]
+        self.assertEqual(len(set(other_keys + [key])), len(other_keys) + 1)
+
+    def test_least_recently_used(self):
+        txt_file = os.path.join(self.directory, "new.txt")
+        shutil.copy(get_data_file("new.dis.txt"), txt_file)
+        size = os.path.getsize(txt_file)
+        self.cache.max_size = size * 2
+        now = os.stat(txt_file).st_mtime_ns
+        for key, age in (("a", 2000), ("b", 1000)):
+            self.cache.store(key, txt_file)
+            entry_file = self.cache._get_entry_file(key)
+            os.utime(entry_file, ns=(now - age * 10 ** 9, now - age * 10 ** 9))
+        self.assertTrue(self.cache.load("a", txt_file))  # "a" is the recently used now, "b" is the least.
+        self.cache.store("c", txt_file)
+        self.assertEqual(self.cache.get_stats()["entries"], 2)
+        self.assertTrue(self.cache.load("a", txt_file))
+        self.assertTrue(self.cache.load("c", txt_file))
+        self.assertFalse(self.cache.load("b", txt_file))
+
+    def test_output_errors_are_not_misses(self):
+        txt_file = os.path.join(self.directory, "new.txt")
+        shutil.copy(get_data_file("new.dis.txt"), txt_file)
+        self.cache.store("key", txt_file)
+        with self.assertRaises(FileNotFoundError):
+            self.cache.load("key", os.path.join(self.directory, "absent", "new.txt"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 0))
+        self.assertFalse(self.cache.load("absent", txt_file))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
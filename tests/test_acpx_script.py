@@ -0,0 +1,290 @@
+import io
+import os
+import re
+import json
+import random
+import contextlib
+import shutil
+import struct
+import tempfile
+import unittest
+from acpx_script import ACPXBinScript
+
+
+# Reference data in tests/data is made by the original (baseline) ACPXBinScript:
+# <name>.txt -- source text, <name>.bin (and .001) -- assembled from it,
+# <name>.dis.txt -- disassembled from <name>.bin, <name>.rt.bin (and .rt.001) -- assembled from <name>.dis.txt.
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SCRIPTS = (
+    ("v1", "ESCR1_00"),
+    ("new", "ESCR_NEW"),
+)
+
+
+def get_data_file(name: str) -> str:
+    """Get name of the reference data file."""
+    return os.path.join(DATA_DIRECTORY, name)
+
+
+def read_data(file_name: str) -> bytes:
+    """Read the file as bytes."""
+    with open(file_name, 'rb') as df:
+        return df.read()
+
+
+class ACPXBinScriptTest(unittest.TestCase):
+    """Byte-identical outputs against the reference data."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertSameScript(self, bin_file: str, reference_name: str, version: str) -> None:
+        """Check the bin script (and its .001 file) against the reference ones."""
+        self.assertEqual(read_data(bin_file), read_data(get_data_file(reference_name + ".bin")))
+        if version == "ESCR_NEW":
+            self.assertEqual(read_data(os.path.splitext(bin_file)[0] + ".001"),
+                             read_data(get_data_file(reference_name + ".001")))
+
+    def test_assemble(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                bin_file = os.path.join(self.directory, name + ".bin")
+                ACPXBinScript(bin_file, get_data_file(name + ".txt"), version=version).assemble()
+                self.assertSameScript(bin_file, name, version)
+
+    def test_disassemble(self):
+        for name, version in SCRIPTS:
+            for single_pass in (True, False):
+                with self.subTest(name=name, single_pass=single_pass):
+                    txt_file = os.path.join(self.directory, name + ".txt")
+                    ACPXBinScript(get_data_file(name + ".bin"), txt_file, version=version).disassemble(
+                        single_pass=single_pass)
+                    self.assertEqual(read_data(txt_file), read_data(get_data_file(name + ".dis.txt")))
+
+    def test_round_trip(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                bin_file = os.path.join(self.directory, name + ".rt.bin")
+                ACPXBinScript(bin_file, get_data_file(name + ".dis.txt"), version=version).assemble()
+                self.assertSameScript(bin_file, name + ".rt", version)
+
+    def test_data_interface(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                with open(get_data_file(name + ".txt"), 'r', encoding="cp932") as df:
+                    text = df.read()
+                bin_data, data_001 = ACPXBinScript(version=version).assemble_data(text)
+                self.assertEqual(bin_data, read_data(get_data_file(name + ".bin")))
+                if version == "ESCR_NEW":
+                    self.assertEqual(data_001, read_data(get_data_file(name + ".001")))
+                    data_001 = read_data(get_data_file(name + ".001"))
+                else:
+                    self.assertIsNone(data_001)
+
+                single = ACPXBinScript(version=version).disassemble_data(bin_data, data_001, single_pass=True)
+                double = ACPXBinScript(version=version).disassemble_data(bin_data, data_001, single_pass=False)
+                self.assertEqual(single, double)
+                with open(get_data_file(name + ".dis.txt"), 'r', encoding="cp932") as df:
+                    self.assertEqual(single, df.read())
+
+
+class ACPXStringsOnlyTest(unittest.TestCase):
+    """Reassembling with the old code block when only the strings were changed."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.texts = {}
+        for name, version in SCRIPTS:
+            with open(get_data_file(name + ".txt"), 'r', encoding="cp932") as df:
+                self.texts[name] = df.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def change_strings(text: str) -> str:
+        """Change every message string (not the labels) of the text."""
+        return re.sub(r'^\["([^"*\\]*)"', r'["\1あ\\"<r>"', text, flags=re.M)
+
+    @staticmethod
+    def change_label(text: str) -> str:
+        """Change the first label argument of the text."""
+        return re.sub(r'"\*[0-9]+"', '"*0"', text, count=1)
+
+    def test_assemble_text(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                script_obj = ACPXBinScript(version=version)
+                text = self.texts[name]
+                *result, build = script_obj.assemble_text(text)
+                self.assertEqual(tuple(result), script_obj.assemble_data(text))
+
+                new_text = self.change_strings(text)
+                self.assertNotEqual(new_text, text)
+                *result, new_build = script_obj.assemble_text(new_text, build)
+                self.assertIs(new_build, build)  # The code block is reused.
+                self.assertEqual(tuple(result), script_obj.assemble_data(new_text))
+
+                new_text = self.change_label(text)
+                self.assertNotEqual(new_text, text)
+                *result, new_build = script_obj.assemble_text(new_text, build)
+                self.assertIsNot(new_build, build)
+                self.assertEqual(tuple(result), script_obj.assemble_data(new_text))
+
+    def test_sidecar(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                txt_file = os.path.join(self.directory, name + ".txt")
+                bin_file = os.path.join(self.directory, name + ".bin")
+                reference_file = os.path.join(self.directory, name + ".ref.bin")
+                text = self.texts[name]
+                for text in (text, self.change_strings(text), self.change_label(text)):
+                    with open(txt_file, 'w', encoding="cp932") as df:
+                        df.write(text)
+                    ACPXBinScript(bin_file, txt_file, version=version).assemble(ir_cache=True)
+                    ACPXBinScript(reference_file, txt_file, version=version).assemble()
+                    self.assertEqual(read_data(bin_file), read_data(reference_file))
+
+                with open(bin_file, 'r+b') as af:  # The old code block is touched.
+                    code_block_start = 24
+                    if version != "ESCR_NEW":
+                        code_block_start = 16 + 4 * struct.unpack('<I', read_data(bin_file)[8:12])[0]
+                    af.seek(code_block_start)
+                    af.write(b'\xfe')
+                ACPXBinScript(bin_file, txt_file, version=version).assemble(ir_cache=True)
+                self.assertEqual(read_data(bin_file), read_data(reference_file))
+
+    def test_broken_sidecar(self):
+        txt_file = os.path.join(self.directory, "new.txt")
+        bin_file = os.path.join(self.directory, "new.bin")
+        shutil.copy(get_data_file("new.txt"), txt_file)
+        script_obj = ACPXBinScript(bin_file, txt_file, version="ESCR_NEW")
+        script_obj.assemble(ir_cache=True)
+        sidecar = read_data(script_obj.ir_cache_file)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["new.001", "new.bin", "new.txt", "new.txt.acpxc"])
+
+        flipped = bytearray(sidecar)
+        flipped[-10] ^= 0xff
+        for broken in (b'', sidecar[:10], sidecar[:100], sidecar[:-1], bytes(flipped)):
+            with self.subTest(length=len(broken)):
+                for name in ("new.bin", "new.001"):  # Only the sidecar is left to assemble with.
+                    os.remove(os.path.join(self.directory, name))
+                with open(script_obj.ir_cache_file, 'wb') as cf:
+                    cf.write(broken)
+                script_obj.assemble(ir_cache=True)
+                self.assertEqual(read_data(bin_file), read_data(get_data_file("new.bin")))
+                self.assertEqual(read_data(script_obj.ir_cache_file), sidecar)
+
+
+class ACPXIterInstructionsTest(unittest.TestCase):
+    """Lazy decoding against the disassembled text."""
+
+    @staticmethod
+    def render(script_obj: ACPXBinScript) -> str:
+        """Write the instructions of the script as the disassembler does in debug mode, with their offsets."""
+        encode_args = json.JSONEncoder(ensure_ascii=False).encode
+        lines = []
+        free_bytes = None
+        for instruction in script_obj.iter_instructions():
+            if instruction.label is not None:
+                lines.append("*{}\n".format(instruction.label))
+            if instruction.opcode is None:  # Written before the next command, after its label.
+                free_bytes = instruction
+                continue
+            if free_bytes is not None:
+                lines.append("#0>{}{}\n".format(free_bytes.arguments.hex(' '),
+                                                script_obj.offset_string(free_bytes.offset)))
+                free_bytes = None
+            lines.append("#1>{}{}\n".format(instruction.name, script_obj.offset_string(instruction.offset)))
+            lines.append(encode_args(instruction.arguments) + '\n')
+        if free_bytes is not None:
+            lines.append("#0>{}{}\n".format(free_bytes.arguments.hex(' '), script_obj.offset_string(free_bytes.offset)))
+        return "".join(lines)
+
+    def test_same_as_disassembly(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                with tempfile.TemporaryDirectory() as directory:
+                    txt_file = os.path.join(directory, name + ".txt")
+                    with contextlib.redirect_stdout(io.StringIO()):  # Debug mode is verbose.
+                        ACPXBinScript(get_data_file(name + ".bin"), txt_file, version=version,
+                                      debug=True).disassemble()
+                    with open(txt_file, 'r', encoding="cp932") as df:
+                        text = df.read()
+                script_obj = ACPXBinScript(get_data_file(name + ".bin"), version=version, debug=True)
+                self.assertEqual(self.render(script_obj), text)
+
+    @unittest.skipUnless(os.path.isdir("/proc/self/fd"), "no /proc")
+    def test_early_close(self):
+        for name, version in SCRIPTS:
+            with self.subTest(name=name):
+                bin_file = get_data_file(name + ".bin")
+                instructions = ACPXBinScript(bin_file, version=version).iter_instructions()
+                next(instructions)
+                instructions.close()
+                open_files = set()
+                for fd in os.listdir("/proc/self/fd"):
+                    try:
+                        open_files.add(os.readlink(os.path.join("/proc/self/fd", fd)))
+                    except OSError:  # The listing's own descriptor.
+                        pass
+                self.assertNotIn(bin_file, open_files)
+                self.assertNotIn(os.path.splitext(bin_file)[0] + ".001", open_files)
+
+
+class ACPXTextParsingTest(unittest.TestCase):
+    """Empty lines, comments and line numbers of the errors in the text."""
+
+    def test_empty_lines_before_arguments(self):
+        script_obj = ACPXBinScript(version="ESCR_NEW")
+        self.assertEqual(script_obj.assemble_data('#1>MESSAGE\n\n@ comment\n   \n["x"]\n'),
+                         script_obj.assemble_data('#1>MESSAGE\n["x"]\n'))
+
+    def test_error_line_numbers(self):
+        cases = (
+            ('#1>MESSAGE\n\n[\n', "Incorrect arguments at line 3"),
+            ('#1>MESSAGE\n\n[1]\n', "Incorrect arguments at line 3"),
+            ('#1>MESSAGE\n\n[]\n', "Not enough arguments at line 3"),
+            ('*0\n#1>2d\n\n["x"]\n', "Incorrect arguments at line 4"),
+            ('#1>MESSAGE\n\n', "No arguments for the command at line 1"),
+        )
+        for text, message in cases:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError) as context:
+                    ACPXBinScript(version="ESCR_NEW").assemble_data(text)
+                self.assertTrue(str(context.exception).startswith(message), str(context.exception))
+
+
+class ACPXRestringTest(unittest.TestCase):
+    """str.translate of restring against the chained replace it has replaced."""
+
+    @staticmethod
+    def chained_restring(string: str, inner: str, outer: str) -> str:
+        """Restring as it was: one str.replace per character."""
+        for in_char, out_char in zip(ACPXBinScript._string_format[inner], ACPXBinScript._string_format[outer]):
+            string = string.replace(in_char, out_char)
+        return string
+
+    def test_format_characters(self):
+        all_characters = "".join(ACPXBinScript._string_format.values()) + "abc 123 <r> 漢字"
+        for inner, outer in (("internal", "external"), ("external", "internal")):
+            with self.subTest(inner=inner, outer=outer):
+                self.assertEqual(ACPXBinScript.restring(all_characters, inner, outer),
+                                 self.chained_restring(all_characters, inner, outer))
+
+    def test_random_strings(self):
+        rnd = random.Random(0)
+        alphabet = "".join(ACPXBinScript._string_format.values()) + "abc <>\\\"漢字"
+        for _ in range(1000):
+            string = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 40)))
+            for inner, outer in (("internal", "external"), ("external", "internal")):
+                self.assertEqual(ACPXBinScript.restring(string, inner, outer),
+                                 self.chained_restring(string, inner, outer))
+
+
+if __name__ == '__main__':
+    unittest.main()
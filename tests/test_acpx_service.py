@@ -0,0 +1,90 @@
+import os
+import stat
+import time
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from acpx_service import ACPXService, ACPXServiceClient
+from tests.test_acpx_script import get_data_file, read_data
+
+
+class ACPXServiceTest(unittest.TestCase):
+    """Access to the service and assembling through it."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)  # After the service is stopped.
+
+    def start(self, service: ACPXService) -> None:
+        """Start the service in the thread and wait for it to listen."""
+        thread = threading.Thread(target=service.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 10)
+        self.addCleanup(service.shutdown)
+        while service._server is None:
+            time.sleep(0.01)
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "no Unix sockets")
+    def test_unix_socket(self):
+        unix_socket = os.path.join(self.directory, "service.sock")
+        self.start(ACPXService(unix_socket=unix_socket))
+        self.assertEqual(stat.S_IMODE(os.stat(unix_socket).st_mode), 0o600)
+
+        bin_file = os.path.join(self.directory, "bin", "new.bin")
+        with ACPXServiceClient(unix_socket=unix_socket) as client:
+            response = client.request("assemble", txt=get_data_file("new.txt"), bin=bin_file, version="ESCR_NEW")
+            self.assertTrue(response["ok"], response)
+        self.assertEqual(read_data(bin_file), read_data(get_data_file("new.bin")))
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "no Unix sockets")
+    def test_running_service_is_kept(self):
+        unix_socket = os.path.join(self.directory, "service.sock")
+        self.start(ACPXService(unix_socket=unix_socket))
+        with self.assertRaises(OSError):
+            ACPXService(unix_socket=unix_socket).serve_forever()
+        with ACPXServiceClient(unix_socket=unix_socket) as client:
+            self.assertTrue(client.request("stats")["ok"])
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "no Unix sockets")
+    def test_stale_socket_is_replaced(self):
+        unix_socket = os.path.join(self.directory, "service.sock")
+        stale_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale_socket.bind(unix_socket)  # Left by the killed service.
+        stale_socket.close()
+        self.start(ACPXService(unix_socket=unix_socket))
+        with ACPXServiceClient(unix_socket=unix_socket) as client:
+            self.assertTrue(client.request("stats")["ok"])
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "no Unix sockets")
+    def test_not_socket_is_kept(self):
+        unix_socket = os.path.join(self.directory, "service.sock")
+        with open(unix_socket, 'wb'):
+            pass
+        with self.assertRaises(FileExistsError):
+            ACPXService(unix_socket=unix_socket).serve_forever()
+        self.assertTrue(os.path.isfile(unix_socket))
+
+    def test_tcp_token(self):
+        service = ACPXService(port=0, token="secret")
+        self.start(service)
+        host, port = service._server.server_address
+        for token, ok in ((None, False), ("wrong", False), ("secret", True)):
+            with self.subTest(token=token):
+                with ACPXServiceClient(host, port, token=token) as client:
+                    client.token = token  # Not the one of the token file.
+                    response = client.request("stats")
+                self.assertEqual(response["ok"], ok, response)
+
+    def test_token_file(self):
+        token_file = os.path.join(self.directory, "token")
+        ACPXService.save_token("secret", token_file)
+        self.assertEqual(ACPXService.load_token(token_file), "secret")
+        if os.name == "posix":
+            self.assertEqual(stat.S_IMODE(os.stat(token_file).st_mode), 0o600)
+        self.assertIsNone(ACPXService.load_token(os.path.join(self.directory, "absent")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from acpx_script import ACPXBinScript
+from acpx_strings_table import ACPXStringsTable
+from tests.test_acpx_script import get_data_file, read_data
+
+
+class ACPXStringsTableTest(unittest.TestCase):
+    """Export and import of the strings table."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.scripts = os.path.join(self.directory, "scripts")
+        os.makedirs(os.path.join(self.scripts, "sub"))
+        for name in ("new.bin", "new.001"):
+            shutil.copy(get_data_file(name), os.path.join(self.scripts, "sub", name))
+        with open(os.path.join(self.scripts, "readme.txt"), 'w') as df:
+            df.write("Not a script.")
+        self.table_file = os.path.join(self.directory, "table.jsonl")
+        self.table = ACPXStringsTable(self.table_file, version="ESCR_NEW")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_table(self) -> list:
+        with open(self.table_file, 'r', encoding="utf-8") as tf:
+            return [json.loads(line) for line in tf]
+
+    def test_export_import(self):
+        number = self.table.export_directory(self.scripts)
+        entries = self.read_table()
+        self.assertEqual(number, len(entries))
+        self.assertEqual({entry["script"] for entry in entries}, {"sub/new.bin"})
+
+        with open(self.table_file, 'w', encoding="utf-8") as tf:
+            for entry in entries:
+                entry["string"] += "!"
+                tf.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.assertEqual(self.table.import_directory(self.scripts), 1)
+        strings = ACPXBinScript(os.path.join(self.scripts, "sub", "new.bin"), version="ESCR_NEW").export_strings()
+        self.assertEqual([string for index, offset, string in strings], [entry["string"] for entry in entries])
+
+    def test_failed_export_keeps_table(self):
+        self.table.export_directory(self.scripts)
+        entries = self.read_table()
+        for name in ("broken.bin", "broken.001"):
+            with open(os.path.join(self.scripts, name), 'wb') as df:
+                df.write(b'junk')
+        with self.assertRaises(ValueError):
+            self.table.export_directory(self.scripts)
+        self.assertEqual(self.read_table(), entries)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["scripts", "table.jsonl"])
+
+    def test_outside_script(self):
+        outside_file = os.path.join(self.directory, "outside.bin")
+        for name in ("new.bin", "new.001"):
+            shutil.copy(get_data_file(name), os.path.join(self.directory, "outside" + os.path.splitext(name)[1]))
+        with open(self.table_file, 'w', encoding="utf-8") as tf:
+            tf.write(json.dumps({"script": "../outside.bin", "index": 0, "offset": 0, "string": "x"}) + '\n')
+        with self.assertRaises(ValueError):
+            self.table.import_directory(self.scripts)
+        self.assertEqual(read_data(outside_file), read_data(get_data_file("new.bin")))
+
+    def test_failed_import_changes_nothing(self):
+        shutil.copytree(os.path.join(self.scripts, "sub"), os.path.join(self.scripts, "sub2"))
+        self.table.export_directory(self.scripts)
+        entries = self.read_table()
+        with open(self.table_file, 'w', encoding="utf-8") as tf:
+            for entry in entries:
+                # The first script is correct, the last string of the second one cannot be encoded.
+                if entry["script"] == "sub2/new.bin" and entry is entries[-1]:
+                    entry["string"] = "\u0101"
+                else:
+                    entry["string"] += "!"
+                tf.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        with self.assertRaises(ValueError):
+            self.table.import_directory(self.scripts)
+        for script in ("sub", "sub2"):
+            for name in ("new.bin", "new.001"):
+                self.assertEqual(read_data(os.path.join(self.scripts, script, name)), read_data(get_data_file(name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from acpx_script import ACPXBinScript
+from acpx_watch import ACPXWatcher
+from tests import test_acpx_script
+from tests.test_acpx_script import get_data_file, read_data
+
+
+class ACPXWatcherTest(unittest.TestCase):
+    """Polls of the watcher, driven by hand."""
+
+    debounce = 0.2
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.txt_directory = os.path.join(self.directory, "txt")
+        self.bin_directory = os.path.join(self.directory, "bin")
+        os.makedirs(self.txt_directory)
+        self.txt_file = os.path.join(self.txt_directory, "new.txt")
+        self.bin_file = os.path.join(self.bin_directory, "new.bin")
+        with open(get_data_file("new.txt"), 'r', encoding="cp932") as df:
+            self.text = df.read()
+        self.builds = []
+        self.watcher = ACPXWatcher(self.txt_directory, self.bin_directory, version="ESCR_NEW",
+                                   debounce=self.debounce, on_build=lambda *result: self.builds.append(result))
+
+    def write_text(self, text: str) -> None:
+        with open(self.txt_file, 'w', encoding="cp932") as df:
+            df.write(text)
+
+    def wait_debounce(self) -> None:
+        time.sleep(self.debounce * 1.5)
+
+    def test_debounce(self):
+        self.write_text(self.text)
+        self.assertEqual(self.watcher.poll(), [])  # Just saved.
+        time.sleep(self.debounce * 0.75)
+        self.write_text(self.text + "\n")  # Still changing.
+        self.assertEqual(self.watcher.poll(), [])
+        time.sleep(self.debounce * 0.75)
+        self.assertEqual(self.watcher.poll(), [])
+        self.wait_debounce()
+        self.assertEqual(self.watcher.poll(), [self.txt_file])
+        self.assertEqual(read_data(self.bin_file), read_data(get_data_file("new.bin")))
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_strings_only_edit(self):
+        self.write_text(self.text)
+        self.watcher.poll()
+        self.wait_debounce()
+        self.assertEqual(self.watcher.poll(), [self.txt_file])
+        build = self.watcher._warm[self.txt_file][1]
+
+        new_text = test_acpx_script.ACPXStringsOnlyTest.change_strings(self.text)
+        self.write_text(new_text)
+        self.watcher.poll()
+        self.wait_debounce()
+        self.assertEqual(self.watcher.poll(), [self.txt_file])
+        self.assertIs(self.watcher._warm[self.txt_file][1], build)  # The code block is reused.
+        bin_data, data_001 = ACPXBinScript(version="ESCR_NEW").assemble_data(new_text)
+        self.assertEqual(read_data(self.bin_file), bin_data)
+        self.assertEqual([error for scr_file, txt_file, error, elapsed in self.builds], [None, None])
+
+    def test_deleted_text(self):
+        self.write_text(self.text)
+        self.watcher.poll()
+        self.wait_debounce()
+        self.watcher.poll()
+        self.write_text(self.text + "\n")
+        self.watcher.poll()
+        os.remove(self.txt_file)
+        self.watcher.poll()
+        self.assertNotIn(self.txt_file, self.watcher._warm)
+        self.wait_debounce()
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(len(self.builds), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()